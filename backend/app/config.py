@@ -3,9 +3,91 @@ import os
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 GENERATED_DIR = os.path.join(BASE_DIR, "static", "audio")
 AMBIENCE_FILE = os.path.join(BASE_DIR, "assets", "background_ambience.mp3")
+PDF_SOURCE_FILE = os.path.join(BASE_DIR, "assets", "mythology_source.pdf")
+
+# Derived data (PDF index, etc.) that can always be rebuilt from the sources
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+PDF_INDEX_FILE = os.path.join(CACHE_DIR, "pdf_index.json")
 
 VOICE_MALE = "en-IN-PrabhatNeural"
 VOICE_FEMALE = "en-IN-NeerjaNeural"
+TTS_DEFAULT_RATE = "-10%"  # smart stretching: slower rate for profound narration
 AMBIENCE_VOLUME_ADJUST = -35  # dB
 
 os.makedirs(GENERATED_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Background jobs for /generate_episode
+JOB_WORKERS = 2
+JOB_QUEUE_MAXSIZE = 50
+JOB_HISTORY_LIMIT = 500  # finished jobs kept for status polling
+
+# Pools for blocking work called from async handlers
+CPU_EXECUTOR_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # processes: PDF parsing
+IO_EXECUTOR_WORKERS = 8  # threads: file copies, mixing, disk I/O
+BACKGROUND_EXECUTOR_WORKERS = 1  # processes: pre-generation, kept apart from listener requests
+
+# Long texts are synthesized as concurrent segments and joined frame by frame
+TTS_SEGMENT_MAX_CHARS = 2500
+TTS_SEGMENT_CONCURRENCY = 4
+TTS_SEGMENT_RETRIES = 2
+
+# Bump whenever the mixing code changes so content-addressed outputs are re-synthesized
+# (the effective settings themselves are part of the key; see audio_service.mix_settings)
+AMBIENCE_CONFIG_VERSION = 2
+
+# Ambience mixing (ffmpeg)
+FFMPEG_BINARY = "ffmpeg"
+MIX_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # processes for batch mixing
+MIX_MP3_QUALITY = 4  # libmp3lame VBR quality, 0 (best) .. 9
+
+# NumPy DSP stage: loudness normalization, ducking and fades, processed in PCM blocks
+DSP_SAMPLE_RATE = 24000  # edge-tts voices are 24 kHz mono
+DSP_BLOCK_SECONDS = 2.0
+LOUDNESS_TARGET_LUFS = -16.0
+DUCKING_THRESHOLD_DB = -40.0  # speech RMS (dBFS) that counts as speech present
+DUCKING_DEPTH_DB = -10.0  # extra bed attenuation while speech is present
+DUCKING_WINDOW_MS = 50
+DUCKING_HOLD_MS = 400  # keep the bed ducked through short pauses between words
+FADE_IN_SECONDS = 1.5
+FADE_OUT_SECONDS = 3.0
+
+# Segmented (HLS) packaging of finished chapter audio
+HLS_DIR = os.path.join(GENERATED_DIR, "hls")
+HLS_SEGMENT_SECONDS = 10
+
+# Audio map (snapshot + journal), re-read by the server whenever it changes on disk
+AUDIO_MAP_FILE = os.path.join(BASE_DIR, "audio_map.json")
+AUDIO_MAP_POLL_SECONDS = 2.0
+
+# Full-text search over the parsed chapter corpus (written by pdf_content_parser.py)
+STRUCTURED_CONTENT_FILE = os.path.join(BASE_DIR, "structured_content.json")
+SEARCH_RESULT_LIMIT = 10
+SEARCH_MAX_RESULTS = 50
+SEARCH_SNIPPET_CHARS = 160
+SEARCH_TITLE_WEIGHT = 3  # a title match counts as this many occurrences in the text
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Prometheus metrics served at /metrics
+METRICS_PREFIX = "omstream"
+METRICS_STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Coordination between uvicorn workers (and batch runs): per-key file locks plus a
+# SQLite registry of generations in progress
+LOCK_DIR = os.path.join(CACHE_DIR, "locks")
+REGISTRY_FILE = os.path.join(CACHE_DIR, "coordination.sqlite3")
+REGISTRY_BUSY_TIMEOUT = 5.0  # seconds a writer waits for another worker's transaction
+GENERATION_LOCK_POLL_SECONDS = 0.1
+os.makedirs(LOCK_DIR, exist_ok=True)
+
+# Background pre-generation of the chapters that follow the one being played
+PREFETCH_AHEAD = 2  # chapters after the current one
+PREFETCH_QUEUE_MAXSIZE = 4  # oldest pending chapters are dropped beyond this
+PREFETCH_MAX_FOREGROUND = 0  # run only while at most this many listener generations are in progress
+PREFETCH_CHECK_SECONDS = 0.5  # how often a running pre-generation re-checks foreground load
+
+# Narration variants (voice x speaking rate) pre-generated by generate_all_episodes.py;
+# the audio map holds one file per variant and requests pick theirs
+VARIANT_VOICES = ("male", "female")
+VARIANT_RATES = (TTS_DEFAULT_RATE, "+25%")
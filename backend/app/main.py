@@ -1,22 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-import json
+import mimetypes
 import os
 
 from .routes import story_routes
-from .config import BASE_DIR, GENERATED_DIR
-
-app = FastAPI()
-
-# Load audio map
-AUDIO_MAP_FILE = os.path.join(BASE_DIR, "audio_map.json")
-if not os.path.exists(AUDIO_MAP_FILE):
-    raise RuntimeError("audio_map.json not found. Please run generate_audio_map.py first.")
-with open(AUDIO_MAP_FILE, 'r', encoding='utf-8') as f:
-    audio_map = json.load(f)
-
-app.state.audio_map = audio_map
+from .services.job_service import job_queue
+from .services.executor_service import shutdown_executors
+from .services.audio_map_service import AudioMapWatcher
+from .services.prefetch_service import prefetcher
+from .config import BASE_DIR, GENERATED_DIR, AUDIO_MAP_FILE
+from .utils.static_files import FingerprintedStaticFiles
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_queue.start()
+    audio_map_watcher.start()
+    prefetcher.start()
+    yield
+    await prefetcher.stop()
+    await audio_map_watcher.stop()
+    await job_queue.stop()
+    shutdown_executors()
+
+app = FastAPI(lifespan=lifespan)
+
+# Load audio map; the watcher swaps in new versions as batch runs update it
+audio_map_watcher = AudioMapWatcher(app, AUDIO_MAP_FILE)
+audio_map_watcher.load_now()
 
 # CORS
 app.add_middleware(
@@ -35,9 +47,11 @@ app.include_router(story_routes.router)
 def root():
     return {"message": "OmStream Backend is running."}
 
-# Static mounts
+# Static mounts (HLS playlists and segments are served from /audio/hls)
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
 AUDIO_DIR = os.path.join(BASE_DIR, "static", "audio")
-app.mount("/audio", StaticFiles(directory=AUDIO_DIR), name="audio")
+app.mount("/audio", FingerprintedStaticFiles(directory=AUDIO_DIR), name="audio")
 app.mount(
     "/images",
     StaticFiles(directory="../frontend/public/images"),
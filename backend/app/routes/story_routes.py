@@ -1,89 +1,316 @@
 import os
-import uuid
-import re
+import time
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
-from ..services.story_generator import load_stories
-from ..services.tts_service import generate_speech
+from ..services.story_generator import load_stories_response
+from ..services.tts_service import stream_speech, check_rate, DEFAULT_RATE
 from ..services.audio_service import mix_with_ambience
-from ..utils.file_utils import extract_chapter_text
-from ..config import GENERATED_DIR
+from ..services.job_service import job_queue, JobQueueFull
+from ..services.executor_service import run_cpu, run_io, executor_stats
+from ..services.synthesis_cache import synthesize_cached, cached_filename, cache_stats
+from ..utils.file_utils import extract_chapter_text, find_chapter_text, content_hash, audio_url, audio_path
+from ..services.hls_service import package_hls
+from ..services.search_service import load_search_index, search_index_ready
+from ..services.coordination_service import (
+    generation_lock, try_claim_generation, wait_for_generation, active_generations,
+)
+from ..services.metrics_service import time_stage, increment, render_metrics, track_in_flight
+from ..services.prefetch_service import prefetcher
+from ..services.audio_map_service import find_variant, variant_key
+from ..utils.concurrency_utils import single_flight, wait_inflight, temp_path_for
+from ..config import GENERATED_DIR, SEARCH_RESULT_LIMIT, SEARCH_MAX_RESULTS
 
 router = APIRouter()
 
 class PlayRequest(BaseModel):
     chapter_title: str
     voice_gender: str = "male"
+    rate: str = DEFAULT_RATE  # edge-tts speaking rate, e.g. "+25%"
+    format: str = "mp3"  # "mp3" or "hls"
 
 class EpisodeRequest(BaseModel):
     text: str
 
 @router.get("/stories")
-def get_stories():
-    return load_stories()
+def get_stories(request: Request):
+    catalog = load_stories_response()
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    encoding = next((e for e in ("br", "gzip") if e in accepted and e in catalog["variants"]), "identity")
+    headers = {"ETag": catalog["etags"][encoding], "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+    if_none_match = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    if "*" in if_none_match or headers["ETag"] in if_none_match:
+        return Response(status_code=304, headers=headers)
+    for tag in if_none_match:
+        if tag in catalog["etags"].values():
+            # The client holds the current catalog in another content-coding
+            return Response(status_code=304, headers={**headers, "ETag": tag})
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(catalog["variants"][encoding], media_type="application/json", headers=headers)
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
 
 @router.post("/play/{voice_gender}")
-async def play_chapter(request: Request, play_request: PlayRequest, voice_gender: str): # voice_gender is currently ignored as pre-generated files are voice-agnostic
+async def play_chapter(request: Request, play_request: PlayRequest, voice_gender: str):
     audio_map = request.app.state.audio_map
     chapter_title = play_request.chapter_title
+    rate = _checked_rate(play_request.rate)
     
     print(f"Received request for chapter: {chapter_title}")
 
-    if chapter_title in audio_map:
-        filename = audio_map[chapter_title]['filename']
+    variant, text = await _mapped_variant(audio_map, chapter_title, voice_gender, rate)
+    if variant:
+        filename = variant['filename']
         print(f"Found in audio map. Filename: {filename}")
-        return {"url": f"/audio/{filename}"}
+        increment("audio_map_hits")
+        response = {"url": await _fingerprinted_url(filename, variant.get('sha256'))}
     else:
-        print(f"Chapter '{chapter_title}' not found in audio map. Falling back to generation.")
+        print(f"Chapter '{chapter_title}' ({variant_key(voice_gender, rate)}) not found in audio map. "
+              f"Falling back to generation.")
         # Fallback to on-the-fly generation if not in map
-        return await generate_and_play_chapter(chapter_title, voice_gender)
+        increment("fallback_generations")
+        with track_in_flight("foreground_generations"):
+            filename = await _generate_chapter_file(chapter_title, voice_gender, rate, text)
+        response = {"url": await _fingerprinted_url(filename)}
+
+    # Listeners usually continue in order: get the next chapters ready while idle
+    prefetcher.schedule(chapter_title, voice_gender, rate, audio_map)
+
+    if play_request.format == "hls":
+        # Segmented playlist for instant seek; falls back to the MP3 URL without ffmpeg or on failure
+        try:
+            playlist = await single_flight(f"hls:{filename}", lambda: _package_hls_locked(filename))
+        except Exception as e:
+            print(f"HLS packaging failed for {filename}, serving the MP3: {e}")
+            playlist = None
+        if playlist:
+            response = {"url": await _fingerprinted_url(playlist), "mp3_url": response["url"]}
+    return response
+
+async def _mapped_variant(audio_map: dict, chapter_title: str, voice_gender: str, rate: str):
+    """(entry, None) for a pre-generated file to serve, or (None, text) to synthesize.
+
+    Each voice/rate combination is a separate pre-generated file. A mapped chapter
+    missing the requested one is synthesized from its PDF text; when the PDF has no
+    usable text for it, the existing narration beats placeholder speech. The text
+    is None when the chapter is not mapped at all.
+    """
+    entry = audio_map.get(chapter_title)
+    variant = find_variant(entry, voice_gender, rate)
+    if variant or not entry:
+        return variant, None
+
+    with time_stage("pdf_extraction"):
+        text = await run_cpu(find_chapter_text, chapter_title)
+    if text is None:
+        print(f"No PDF text for '{chapter_title}'; serving its existing narration instead of "
+              f"{variant_key(voice_gender, rate)}.")
+        return find_variant(entry, "male") or next(iter(entry.get("variants", {}).values()), None), None
+    return None, text
+
+def _checked_rate(rate: str) -> str:
+    try:
+        return check_rate(rate)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+async def _package_hls_locked(filename: str):
+    async with generation_lock(f"hls_{os.path.splitext(filename)[0]}"):
+        return await run_io(package_hls, filename)
 
-async def generate_and_play_chapter(chapter_title: str, voice_gender: str):
+async def _fingerprinted_url(relative_path: str, digest: str = None) -> str:
+    # Hashes are cached per file, so only the first request after a change reads it
+    if digest is None:
+        with time_stage("file_io"):
+            digest = await run_io(content_hash, audio_path(relative_path))
+    return audio_url(relative_path, digest)
+
+async def generate_and_play_chapter(chapter_title: str, voice_gender: str, rate: str = DEFAULT_RATE):
+    output_file = await _generate_chapter_file(chapter_title, voice_gender, rate)
+    return {"url": await _fingerprinted_url(output_file)}
+
+async def _generate_chapter_file(chapter_title: str, voice_gender: str, rate: str = DEFAULT_RATE,
+                                 text: str = None) -> str:
         
     print(f"Received request for chapter: {chapter_title} with voice: {voice_gender}")
 
-    safe_title = re.sub(r"[^a-zA-Z0-9_-]", "_", chapter_title)
-    voice_prefix = f"{voice_gender.lower()}_" if voice_gender.lower() == "female" else ""
-    output_file = f"{voice_prefix}{safe_title}.mp3"
-    output_path = os.path.join(GENERATED_DIR, output_file)
+    if text is None:
+        with time_stage("pdf_extraction"):
+            text = await run_cpu(extract_chapter_text, chapter_title)
+    print(f"Extracted text length: {len(text)} characters")
+
+    # Keyed by content, voice, rate and mix settings; concurrent misses share one synthesis
+    return await synthesize_cached(text, voice_gender, rate)
 
-    print(f"Output file will be: {output_file}")
+@router.get("/stream/{voice_gender}")
+async def stream_chapter(request: Request, chapter_title: str, voice_gender: str, rate: str = DEFAULT_RATE):
+    audio_map = request.app.state.audio_map
+    rate = _checked_rate(rate)
+    requested_at = time.perf_counter()
+    variant, text = await _mapped_variant(audio_map, chapter_title, voice_gender, rate)
+    if variant:
+        increment("audio_map_hits")
+        return RedirectResponse(await _fingerprinted_url(variant['filename'], variant.get('sha256')))
+
+    increment("fallback_generations")
+    if text is None:
+        with time_stage("pdf_extraction"):
+            text = await run_cpu(extract_chapter_text, chapter_title)
+    output_file = cached_filename(text, voice_gender, rate)
+    output_path = os.path.join(GENERATED_DIR, output_file)
 
+    # A finished file, or one another request or worker is already producing, is served statically
+    await wait_inflight(output_file)
+    await wait_for_generation(output_file)
     if os.path.exists(output_path):
-        print(f"File already exists, returning existing file: {output_file}")
-        return {"url": f"/audio/{output_file}"}
+        return RedirectResponse(await _fingerprinted_url(output_file))
 
-    text = extract_chapter_text(chapter_title)
-    print(f"Extracted text length: {len(text)} characters")
+    return StreamingResponse(
+        _relay_and_cache(text, voice_gender, rate, output_path, requested_at),
+        media_type="audio/mpeg",
+    )
 
-    speech_file = await generate_speech(text, voice_gender)
-    print("TTS generation completed")
-    
-    mix_with_ambience(speech_file, output_path)
-    print("Audio mixing completed")
-    
-    os.remove(speech_file)
-    print(f"Successfully generated: {output_file}")
-    return {"url": f"/audio/{output_file}"}
+async def _relay_and_cache(text: str, voice_gender: str, rate: str, output_path: str, requested_at: float):
+    """Relay TTS chunks to the client while teeing them into the cache file.
+
+    The relay holds the generation lock for the cache file, so /play and other
+    /stream requests for the same audio (in any worker) wait for it and serve the
+    finished file instead of running their own TTS. The lock is taken here rather
+    than in the handler because a response can be dropped before its body starts.
+    """
+    output_file = os.path.basename(output_path)
+    claim = await try_claim_generation(output_file)
+    while claim is None:
+        # Another request started producing this file after the handler checked
+        await wait_for_generation(output_file)
+        if os.path.exists(output_path):
+            async for chunk in _file_chunks(output_path):
+                yield chunk
+            return
+        claim = await try_claim_generation(output_file)
+
+    speech_tmp = temp_path_for(output_path)
+    mixed_tmp = temp_path_for(output_path)
+    completed = False
+    first_chunk = True
+    with track_in_flight("foreground_generations"):
+        try:
+            with open(speech_tmp, "wb") as cache_file:
+                async for chunk in stream_speech(text, voice_gender, rate):
+                    if first_chunk:
+                        first_chunk = False
+                        ttfb_ms = (time.perf_counter() - requested_at) * 1000
+                        print(f"Streaming {os.path.basename(output_path)}: first audio byte after {ttfb_ms:.0f} ms")
+                    cache_file.write(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            try:
+                # Only a complete stream becomes the cached file; a disconnect discards it
+                if completed:
+                    with time_stage("mixing"):
+                        await run_io(mix_with_ambience, speech_tmp, mixed_tmp)
+                    os.replace(mixed_tmp, output_path)
+                    print(f"Cached streamed audio: {os.path.basename(output_path)}")
+            finally:
+                for path in (speech_tmp, mixed_tmp):
+                    if os.path.exists(path):
+                        os.remove(path)
+                await claim.finish(None if os.path.exists(output_path) else "stream not completed")
+
+async def _file_chunks(path: str, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        while True:
+            chunk = await run_io(f.read, chunk_size)
+            if not chunk:
+                return
+            yield chunk
 
-@router.post("/generate_episode")
+async def _generate_episode_file(text: str) -> str:
+    with track_in_flight("foreground_generations"):
+        output_file = await synthesize_cached(text, "male")
+    return await _fingerprinted_url(output_file)
+
+@router.post("/generate_episode", status_code=202)
 async def generate_episode(request: EpisodeRequest):
     if not request.text.strip():
         raise HTTPException(400, "Text is required")
 
-    speech_file = await generate_speech(request.text, "male")
-    output_file = os.path.join(
-        GENERATED_DIR,
-        f"episode_{uuid.uuid4()}.mp3"
-    )
-
     try:
-        mix_with_ambience(speech_file, output_file)
-        os.remove(speech_file)
+        job = await job_queue.submit(_generate_episode_file, request.text)
+    except JobQueueFull as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "30"})
+
+    return {"job_id": job["id"], "status": job["status"], "status_url": f"/jobs/{job['id']}"}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    # Read from the shared registry: the job may be running in another worker
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "url": job["url"],
+        "error": job["error"],
+    }
+
+@router.get("/search")
+async def search_chapters(request: Request, q: str, limit: int = SEARCH_RESULT_LIMIT):
+    if not q.strip():
+        raise HTTPException(400, "Query is required")
+
+    started = time.perf_counter()
+    # The index is built once (off the event loop); later queries are pure in-memory lookups
+    if search_index_ready():
+        index = load_search_index()
+    else:
+        index = await single_flight("search-index", lambda: run_io(load_search_index))
+    results = index.search(q, max(1, min(limit, SEARCH_MAX_RESULTS)))
+
+    audio_map = request.app.state.audio_map
+    for result in results:
+        # Search results link the default narration
+        entry = find_variant(audio_map.get(result["episode_title"]), "male")
+        result["url"] = await _fingerprinted_url(entry["filename"], entry.get("sha256")) if entry else None
+
+    return {
+        "query": q,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+@router.get("/executors")
+def get_executor_stats():
+    return executor_stats()
+
+@router.get("/metrics")
+def get_metrics():
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    return cache_stats()
 
-        return {"url": f"/audio/{os.path.basename(output_file)}"}
+@router.get("/prefetch")
+def get_prefetch_status():
+    return prefetcher.snapshot()
 
-    except Exception as e:
-        print(f"Episode error: {e}")
-        raise HTTPException(500, "Failed to generate episode")
+@router.get("/generations")
+async def get_active_generations():
+    # Across all workers sharing this cache directory
+    return {"in_progress": await run_io(active_generations)}
@@ -0,0 +1,91 @@
+import asyncio
+import os
+from .executor_service import run_io
+from .tts_service import voice_label, DEFAULT_RATE
+from ..utils.manifest_utils import load_audio_map, journal_path_for
+from ..config import AUDIO_MAP_FILE, AUDIO_MAP_POLL_SECONDS
+
+
+def variant_key(voice_gender: str, rate: str = DEFAULT_RATE) -> str:
+    return f"{voice_label(voice_gender)}:{rate}"
+
+
+def find_variant(entry: dict, voice_gender: str, rate: str = DEFAULT_RATE) -> dict:
+    """The file entry for this voice and rate, or None when it was not pre-generated.
+
+    Entries written before variants existed carry a single male, default-rate
+    file at the top level.
+    """
+    if not entry:
+        return None
+    key = variant_key(voice_gender, rate)
+    variant = entry.get("variants", {}).get(key)
+    if variant is None and "filename" in entry and key == variant_key("male"):
+        return entry
+    return variant
+
+
+class AudioMapWatcher:
+    """Keeps `app.state.audio_map` in sync with the manifest on disk.
+
+    Changes are detected by polling the size/mtime of the snapshot and journal;
+    the new map is parsed in the I/O pool and swapped in as a single reference
+    assignment, so requests always see either the old or the new map.
+    """
+
+    def __init__(self, app, map_path: str = AUDIO_MAP_FILE, interval: float = AUDIO_MAP_POLL_SECONDS):
+        self.app = app
+        self.map_path = map_path
+        self.interval = interval
+        self._stamp = None
+        self._task = None
+
+    def _current_stamp(self):
+        stamp = []
+        for path in (self.map_path, journal_path_for(self.map_path)):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _read(self):
+        stamp = self._current_stamp()
+        audio_map = load_audio_map(self.map_path)
+        return stamp, audio_map
+
+    def load_now(self):
+        """Synchronous initial load; a missing manifest yields an empty map."""
+        self._stamp, audio_map = self._read()
+        if not audio_map:
+            print(f"Audio map is empty or missing ({self.map_path}); chapters will be generated on demand.")
+        self.app.state.audio_map = audio_map
+
+    async def reload_if_changed(self) -> bool:
+        if self._current_stamp() == self._stamp:
+            return False
+        try:
+            stamp, audio_map = await run_io(self._read)
+        except Exception as e:
+            # Keep serving the previous map; the next poll retries
+            print(f"Audio map reload failed: {e}")
+            return False
+        self._stamp = stamp
+        self.app.state.audio_map = audio_map
+        print(f"Audio map reloaded: {len(audio_map)} chapters")
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.reload_if_changed()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -1,38 +1,301 @@
+import functools
+import math
 import os
 import shutil
-from pydub import AudioSegment
-from ..config import AMBIENCE_FILE, AMBIENCE_VOLUME_ADJUST, GENERATED_DIR
-
-# Try to configure ffmpeg path
-try:
-    import ffmpeg
-    FFMPEG_AVAILABLE = True
-    print("FFmpeg Python library found")
-except ImportError:
-    # Fallback to system ffmpeg
-    FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None
-    if FFMPEG_AVAILABLE:
-        print("System FFmpeg found")
+import subprocess
+import tempfile
+from ..config import (
+    AMBIENCE_FILE, AMBIENCE_VOLUME_ADJUST, FFMPEG_BINARY, MIX_MP3_QUALITY,
+    DSP_SAMPLE_RATE, DSP_BLOCK_SECONDS, LOUDNESS_TARGET_LUFS,
+    DUCKING_THRESHOLD_DB, DUCKING_DEPTH_DB, DUCKING_WINDOW_MS, DUCKING_HOLD_MS,
+    FADE_IN_SECONDS, FADE_OUT_SECONDS,
+)
+
+# NumPy is imported on first DSP use (see numpy_available); mixing works without it
+np = None
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_path():
+    """Resolve the ffmpeg executable once; mixing falls back to a plain copy without it."""
+    path = shutil.which(FFMPEG_BINARY)
+    if path:
+        print(f"System FFmpeg found: {path}")
     else:
         print("FFmpeg not found. Audio mixing will be disabled.")
+    return path
+
 
-# Configure AudioSegment to use ffmpeg if available
-if FFMPEG_AVAILABLE:
+@functools.lru_cache(maxsize=None)
+def numpy_available() -> bool:
+    global np
     try:
-        # Try to set ffmpeg path if needed
-        AudioSegment.converter = "ffmpeg"
-        AudioSegment.ffmpeg = "ffmpeg"
-        AudioSegment.ffprobe = "ffprobe"
-    except:
-        pass
+        import numpy
+    except ImportError:
+        print("NumPy not found. Ducking and loudness normalization will be disabled.")
+        return False
+    np = numpy
+    return True
 
-def mix_with_ambience(speech_path: str, output_path: str):
-    # For now, just copy the speech file as final output
-    # TODO: Add ambience mixing when ffmpeg is properly configured
+
+def _require_numpy():
+    if not numpy_available():
+        raise RuntimeError("NumPy is required for the DSP stage")
+
+
+# BS.1770 K-weighting (pre-filter shelf + RLB high-pass), 48 kHz biquad coefficients
+K_WEIGHTING = (
+    ((1.53512485958697, -2.69169618940638, 1.19839281085285), (1.0, -1.69065929318241, 0.73248077421585)),
+    ((1.0, -2.0, 1.0), (1.0, -1.99004745483398, 0.99007225036621)),
+)
+
+# Decoded, gain-adjusted ambience bed, reused for every mix in this process
+_ambience_bed_cache = {}
+
+
+def db_to_gain(db: float) -> float:
+    return 10 ** (db / 20)
+
+
+def _mix_command(speech_path: str, output_path: str) -> list:
+    # The ambience bed loops forever at the configured gain; amix stops with the
+    # speech (duration=first). ffmpeg streams both inputs, so memory use does not
+    # grow with chapter length.
+    filter_graph = (
+        f"[1:a]volume={AMBIENCE_VOLUME_ADJUST}dB[bed];"
+        "[0:a][bed]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[out]"
+    )
+    return [
+        ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+        "-i", speech_path,
+        "-stream_loop", "-1", "-i", AMBIENCE_FILE,
+        "-filter_complex", filter_graph,
+        "-map", "[out]",
+        "-c:a", "libmp3lame", "-q:a", str(MIX_MP3_QUALITY),
+        "-f", "mp3", output_path,
+    ]
+
+
+def _run_ffmpeg_pipe(args: list, **kwargs):
+    # stderr goes to a temp file so a chatty ffmpeg can never block on a full pipe
+    stderr = tempfile.TemporaryFile()
+    proc = subprocess.Popen([ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-y", *args],
+                            stderr=stderr, **kwargs)
+    return proc, stderr
+
+
+def _check_ffmpeg(proc, stderr, what: str):
+    proc.wait()
+    if proc.returncode != 0:
+        stderr.seek(0)
+        error = stderr.read().decode("utf-8", errors="replace").strip()
+        stderr.close()
+        raise RuntimeError(f"ffmpeg {what} failed: {error}")
+    stderr.close()
+
+
+def iter_pcm_blocks(path: str, block_samples: int, sample_rate: int = DSP_SAMPLE_RATE):
+    """Decode any audio file to mono float32 blocks of `block_samples` via an ffmpeg pipe."""
+    _require_numpy()
+    proc, stderr = _run_ffmpeg_pipe(
+        ["-nostdin", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+        stdout=subprocess.PIPE,
+    )
     try:
-        import shutil
+        while True:
+            data = proc.stdout.read(block_samples * 2)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+    finally:
+        proc.stdout.close()
+        _check_ffmpeg(proc, stderr, "decoding")
+
+
+def _k_weighting_power(n_fft: int, sample_rate: int):
+    """|H(f)|^2 of the K-weighting filter at the rfft bin frequencies."""
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+    z = np.exp(-2j * np.pi * freqs / 48000.0)  # z^-1 at the 48 kHz design rate
+    response = np.ones_like(z)
+    for (b0, b1, b2), (a0, a1, a2) in K_WEIGHTING:
+        response *= (b0 + b1 * z + b2 * z * z) / (a0 + a1 * z + a2 * z * z)
+    return np.abs(response) ** 2
+
+
+class LoudnessMeter:
+    """Gated integrated loudness (BS.1770 style) accumulated block by block.
+
+    K-weighting is applied in the frequency domain per 100 ms sub-block, and
+    400 ms gating windows with 75% overlap are formed from the sub-block energies.
+    """
+
+    def __init__(self, sample_rate: int = DSP_SAMPLE_RATE):
+        self.sub_block = sample_rate // 10
+        self.weights = _k_weighting_power(self.sub_block, sample_rate)
+        # Parseval weights for a one-sided spectrum
+        self.weights[1:-1 if self.sub_block % 2 == 0 else None] *= 2
+        self.energies = []
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.samples = 0
+
+    def add(self, block):
+        self.samples += len(block)
+        data = np.concatenate((self._pending, block))
+        usable = len(data) // self.sub_block * self.sub_block
+        self._pending = data[usable:]
+        if usable:
+            frames = data[:usable].reshape(-1, self.sub_block)
+            spectrum = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+            self.energies.extend((spectrum @ self.weights) / (self.sub_block ** 2))
+
+    def integrated(self) -> float:
+        energies = np.asarray(self.energies)
+        if len(energies) < 4:
+            return float("-inf")
+        windows = np.convolve(energies, np.full(4, 0.25), mode="valid")
+        loudness = -0.691 + 10 * np.log10(np.maximum(windows, 1e-12))
+        gated = windows[loudness > -70.0]
+        if not len(gated):
+            return float("-inf")
+        relative_gate = -0.691 + 10 * np.log10(gated.mean()) - 10.0
+        gated = windows[(loudness > -70.0) & (loudness > relative_gate)]
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def measure_loudness(path: str, sample_rate: int = DSP_SAMPLE_RATE):
+    """Return (integrated LUFS, total samples) of an audio file."""
+    _require_numpy()
+    meter = LoudnessMeter(sample_rate)
+    for block in iter_pcm_blocks(path, int(sample_rate * DSP_BLOCK_SECONDS), sample_rate):
+        meter.add(block)
+    return meter.integrated(), meter.samples
+
+
+def _ambience_bed(sample_rate: int = DSP_SAMPLE_RATE):
+    if not os.path.exists(AMBIENCE_FILE):
+        return None
+    key = (AMBIENCE_FILE, os.path.getmtime(AMBIENCE_FILE), sample_rate, AMBIENCE_VOLUME_ADJUST)
+    if key not in _ambience_bed_cache:
+        _ambience_bed_cache.clear()
+        blocks = list(iter_pcm_blocks(AMBIENCE_FILE, sample_rate * 10, sample_rate))
+        bed = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+        _ambience_bed_cache[key] = bed * db_to_gain(AMBIENCE_VOLUME_ADJUST) if len(bed) else None
+    return _ambience_bed_cache[key]
+
+
+class Ducker:
+    """Sidechain gain for the bed from the speech RMS envelope, continuous across blocks."""
+
+    def __init__(self, sample_rate: int = DSP_SAMPLE_RATE):
+        self.window = max(1, sample_rate * DUCKING_WINDOW_MS // 1000)
+        self.hold = max(1, DUCKING_HOLD_MS // DUCKING_WINDOW_MS)
+        self.threshold = db_to_gain(DUCKING_THRESHOLD_DB)
+        self.depth = db_to_gain(DUCKING_DEPTH_DB)
+        self._recent = np.zeros(self.hold - 1, dtype=bool)
+        self._last_gain = 1.0
+
+    def gains(self, speech):
+        n = len(speech)
+        n_windows = -(-n // self.window)
+        padded = np.zeros(n_windows * self.window, dtype=np.float32)
+        padded[:n] = speech
+        rms = np.sqrt(np.mean(padded.reshape(n_windows, self.window) ** 2, axis=1))
+
+        # A window stays ducked while speech was present in any of the last `hold` windows
+        present = np.concatenate((self._recent, rms > self.threshold))
+        held = np.convolve(present.astype(np.float32), np.ones(self.hold), mode="valid") > 0
+        self._recent = present[len(present) - (self.hold - 1):] if self.hold > 1 else self._recent
+        window_gains = np.where(held, self.depth, 1.0)
+
+        # Interpolate window gains to per-sample gains, starting from the previous block's gain
+        centers = np.concatenate(([-self.window / 2], (np.arange(n_windows) + 0.5) * self.window))
+        sample_gains = np.interp(np.arange(n), centers, np.concatenate(([self._last_gain], window_gains)))
+        self._last_gain = float(window_gains[-1])
+        return sample_gains.astype(np.float32)
+
+
+def _fade_gains(start: int, n: int, total: int, sample_rate: int):
+    positions = np.arange(start, start + n, dtype=np.float64)
+    fade_in = np.clip(positions / max(1.0, FADE_IN_SECONDS * sample_rate), 0.0, 1.0)
+    fade_out = np.clip((total - positions) / max(1.0, FADE_OUT_SECONDS * sample_rate), 0.0, 1.0)
+    return (fade_in * fade_out).astype(np.float32)
+
+
+def process_narration(speech_path: str, output_path: str, sample_rate: int = DSP_SAMPLE_RATE):
+    """Loudness-normalize speech, duck the looped ambience bed under it and apply fades.
+
+    Two streaming passes over the speech (measure, then render) in fixed-size
+    blocks; memory stays constant apart from the cached ambience bed.
+    """
+    _require_numpy()
+    loudness, total = measure_loudness(speech_path, sample_rate)
+    gain = db_to_gain(LOUDNESS_TARGET_LUFS - loudness) if math.isfinite(loudness) else 1.0
+    bed = _ambience_bed(sample_rate)
+    ducker = Ducker(sample_rate)
+
+    encoder, stderr = _run_ffmpeg_pipe(
+        ["-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-i", "pipe:0",
+         "-c:a", "libmp3lame", "-q:a", str(MIX_MP3_QUALITY), "-f", "mp3", output_path],
+        stdin=subprocess.PIPE,
+    )
+    position = 0
+    try:
+        for block in iter_pcm_blocks(speech_path, int(sample_rate * DSP_BLOCK_SECONDS), sample_rate):
+            mixed = block * gain
+            if bed is not None:
+                bed_block = np.take(bed, np.arange(position, position + len(block)), mode="wrap")
+                mixed += bed_block * ducker.gains(block)
+            mixed *= _fade_gains(position, len(block), total, sample_rate)
+            position += len(block)
+            pcm = (np.clip(mixed, -1.0, 32767 / 32768) * 32768).astype("<i2")
+            encoder.stdin.write(pcm.tobytes())
+    finally:
+        encoder.stdin.close()
+        _check_ffmpeg(encoder, stderr, "encoding")
+
+    print(f"Narration processed: {loudness:.1f} LUFS -> {LOUDNESS_TARGET_LUFS:.1f} LUFS target")
+
+
+def mix_settings() -> dict:
+    """What mix_with_ambience does on this host, with every setting that shapes its output.
+
+    Part of the synthesis cache key, so a host that can only copy the speech never
+    stores its output under the key of a fully mixed file (and vice versa).
+    """
+    ambience = os.path.getsize(AMBIENCE_FILE) if os.path.exists(AMBIENCE_FILE) else None
+    if not ffmpeg_path():
+        return {"mode": "copy"}
+    if numpy_available():
+        return {
+            "mode": "dsp", "ambience": ambience, "volume_db": AMBIENCE_VOLUME_ADJUST,
+            "quality": MIX_MP3_QUALITY, "sample_rate": DSP_SAMPLE_RATE,
+            "loudness_lufs": LOUDNESS_TARGET_LUFS,
+            "ducking": [DUCKING_THRESHOLD_DB, DUCKING_DEPTH_DB, DUCKING_WINDOW_MS, DUCKING_HOLD_MS],
+            "fades": [FADE_IN_SECONDS, FADE_OUT_SECONDS],
+        }
+    if ambience is None:
+        return {"mode": "copy"}
+    return {"mode": "amix", "ambience": ambience, "volume_db": AMBIENCE_VOLUME_ADJUST, "quality": MIX_MP3_QUALITY}
+
+
+def mix_with_ambience(speech_path: str, output_path: str):
+    if not ffmpeg_path():
+        # Nothing to mix with: the speech is the final output
+        shutil.copy2(speech_path, output_path)
+        print("Audio saved successfully (no ambience mix).")
+        return
+
+    if numpy_available():
+        process_narration(speech_path, output_path)
+        return
+
+    if not os.path.exists(AMBIENCE_FILE):
         shutil.copy2(speech_path, output_path)
-        print(f"Audio saved successfully.")
-    except Exception as e:
-        print(f"Failed to copy audio: {e}")
-        raise e
+        print("Audio saved successfully (no ambience mix).")
+        return
+
+    result = subprocess.run(_mix_command(speech_path, output_path), capture_output=True)
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"ffmpeg mixing failed: {error}")
+    print("Audio mixed with ambience successfully.")
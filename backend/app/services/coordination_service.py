@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from .executor_service import run_io
+from ..utils.lock_utils import FileLock
+from ..config import LOCK_DIR, REGISTRY_FILE, REGISTRY_BUSY_TIMEOUT, GENERATION_LOCK_POLL_SECONDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    key TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    error TEXT,
+    background INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    url TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+)
+"""
+
+JOB_FIELDS = ("id", "status", "url", "error", "created_at", "finished_at")
+
+# One connection per thread; SQLite connections must not be shared across threads
+_local = threading.local()
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != REGISTRY_FILE:
+        conn = sqlite3.connect(REGISTRY_FILE, timeout=REGISTRY_BUSY_TIMEOUT, isolation_level=None)
+        # WAL lets every worker read while one writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _add_background_column(conn)
+        _local.conn = conn
+        _local.path = REGISTRY_FILE
+    return conn
+
+
+def _add_background_column(conn) -> None:
+    # Registries created before pre-generation was told apart from listener work
+    if "background" not in {row[1] for row in conn.execute("PRAGMA table_info(generations)")}:
+        try:
+            conn.execute("ALTER TABLE generations ADD COLUMN background INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass  # another worker added it first
+
+
+def _lock_for(key: str) -> FileLock:
+    return FileLock(os.path.join(LOCK_DIR, f"{key}.lock"))
+
+
+def _mark_running(key: str, background: bool = False) -> None:
+    _connect().execute(
+        "INSERT OR REPLACE INTO generations (key, pid, state, started_at, background) VALUES (?, ?, 'running', ?, ?)",
+        (key, os.getpid(), time.time(), int(background)),
+    )
+
+
+def _mark_finished(key: str, error: str = None) -> None:
+    _connect().execute(
+        "UPDATE generations SET state = ?, finished_at = ?, error = ? WHERE key = ? AND pid = ?",
+        ("failed" if error else "done", time.time(), error, key, os.getpid()),
+    )
+
+
+class GenerationClaim:
+    """A held generation lock and its registry row; finish() records the outcome and releases it."""
+
+    def __init__(self, key: str, lock: FileLock):
+        self.key = key
+        self.lock = lock
+
+    async def finish(self, error: str = None) -> None:
+        try:
+            await run_io(_mark_finished, self.key, error)
+        finally:
+            self.lock.release()
+
+
+async def _claim(key: str, lock: FileLock, background: bool = False) -> GenerationClaim:
+    try:
+        await run_io(_mark_running, key, background)
+    except BaseException:
+        lock.release()
+        raise
+    return GenerationClaim(key, lock)
+
+
+async def try_claim_generation(key: str):
+    """Take the generation lock for `key` without waiting; None when another holder has it."""
+    lock = _lock_for(key)
+    if not lock.acquire(blocking=False):
+        return None
+    return await _claim(key, lock)
+
+
+@asynccontextmanager
+async def generation_lock(key: str, background: bool = False):
+    """Hold the cross-process lock for `key` while producing it.
+
+    Workers that find the lock taken wait for it and then re-check for the
+    finished file themselves, so each key is generated by one worker at a time.
+    The lock is released by the OS if the holder crashes; the registry row only
+    describes what is going on (`background` marks speculative pre-generation).
+    """
+    lock = _lock_for(key)
+    await lock.acquire_async(GENERATION_LOCK_POLL_SECONDS)
+    claim = await _claim(key, lock, background)
+    try:
+        yield
+    except BaseException as e:
+        await claim.finish(repr(e))
+        raise
+    await claim.finish()
+
+
+async def wait_for_generation(key: str) -> None:
+    """Wait while any worker (this one included) holds the generation lock for `key`."""
+    lock = _lock_for(key)
+    await lock.acquire_async(GENERATION_LOCK_POLL_SECONDS)
+    lock.release()
+
+
+def active_generations() -> list:
+    """Generations in progress in any worker; rows whose lock is free were left by a crash."""
+    rows = _connect().execute(
+        "SELECT key, pid, started_at, background FROM generations WHERE state = 'running' ORDER BY started_at"
+    ).fetchall()
+    now = time.time()
+    return [
+        {"key": key, "pid": pid, "running_seconds": round(now - started_at, 1), "background": bool(background)}
+        for key, pid, started_at, background in rows
+        if _lock_for(key).locked_elsewhere()
+    ]
+
+
+def foreground_generation_count() -> int:
+    """Generations in progress in any worker on behalf of a listener (not pre-generation)."""
+    return sum(1 for generation in active_generations() if not generation["background"])
+
+
+def save_job(job: dict) -> None:
+    """Record a /generate_episode job's current state, so any worker can answer a status poll."""
+    _connect().execute(
+        f"INSERT OR REPLACE INTO jobs (pid, {', '.join(JOB_FIELDS)}) VALUES (?{', ?' * len(JOB_FIELDS)})",
+        (os.getpid(), *(job[field] for field in JOB_FIELDS)),
+    )
+
+
+def delete_job(job_id: str) -> None:
+    _connect().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+def load_job(job_id: str):
+    row = _connect().execute(f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return dict(zip(JOB_FIELDS, row)) if row else None
+
+
+def prune_jobs(keep: int) -> None:
+    """Drop all but the `keep` most recently finished jobs (of every worker)."""
+    _connect().execute(
+        "DELETE FROM jobs WHERE finished_at IS NOT NULL AND id NOT IN "
+        "(SELECT id FROM jobs WHERE finished_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?)",
+        (keep,),
+    )
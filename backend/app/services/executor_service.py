@@ -0,0 +1,126 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from ..config import CPU_EXECUTOR_WORKERS, IO_EXECUTOR_WORKERS, BACKGROUND_EXECUTOR_WORKERS
+
+
+class PoolStats:
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+        self.run_seconds_max = 0.0
+
+    def as_dict(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "in_flight": self.in_flight,
+            "avg_wait_ms": round(self.wait_seconds_total / finished * 1000, 2) if finished else 0.0,
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 2),
+            "avg_run_ms": round(self.run_seconds_total / finished * 1000, 2) if finished else 0.0,
+            "max_run_ms": round(self.run_seconds_max * 1000, 2),
+        }
+
+
+def _timed_call(func, args):
+    # Runs inside the pool worker; wall-clock stamps are comparable across processes
+    started = time.time()
+    try:
+        return started, func(*args), None, time.time()
+    except Exception as e:
+        return started, None, e, time.time()
+
+
+_pools = {}
+_stats = {
+    "cpu": PoolStats("cpu", CPU_EXECUTOR_WORKERS),
+    "io": PoolStats("io", IO_EXECUTOR_WORKERS),
+    "background": PoolStats("background", BACKGROUND_EXECUTOR_WORKERS),
+}
+
+
+def _get_pool(kind: str):
+    if kind not in _pools:
+        if kind == "cpu":
+            _pools[kind] = ProcessPoolExecutor(max_workers=CPU_EXECUTOR_WORKERS)
+        elif kind == "background":
+            _pools[kind] = ProcessPoolExecutor(max_workers=BACKGROUND_EXECUTOR_WORKERS)
+        else:
+            _pools[kind] = ThreadPoolExecutor(max_workers=IO_EXECUTOR_WORKERS, thread_name_prefix="io")
+    return _pools[kind]
+
+
+async def _run(kind: str, func, *args):
+    """Await `func(*args)` in the `kind` pool.
+
+    Cancelling the await drops a job that is still queued, but a job a worker has
+    already started runs to completion and keeps that worker busy until then.
+    """
+    stats = _stats[kind]
+    stats.submitted += 1
+    stats.in_flight += 1
+    submitted_at = time.time()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_get_pool(kind), _timed_call, func, args)
+
+    try:
+        started, result, error, finished = await future
+    except asyncio.CancelledError:
+        stats.cancelled += 1
+        raise
+    except Exception:
+        # Pool-level failure (e.g. a crashed worker process)
+        stats.failed += 1
+        raise
+    finally:
+        stats.in_flight -= 1
+
+    wait = max(0.0, started - submitted_at)
+    run = finished - started
+    stats.wait_seconds_total += wait
+    stats.wait_seconds_max = max(stats.wait_seconds_max, wait)
+    stats.run_seconds_total += run
+    stats.run_seconds_max = max(stats.run_seconds_max, run)
+
+    if error is not None:
+        stats.failed += 1
+        raise error
+    stats.completed += 1
+    return result
+
+
+async def run_cpu(func, *args):
+    """Run a CPU-heavy, picklable function (e.g. PDF parsing) in the process pool."""
+    return await _run("cpu", func, *args)
+
+
+async def run_io(func, *args):
+    """Run a blocking I/O function (file copies, mixing) in the thread pool."""
+    return await _run("io", func, *args)
+
+
+async def run_background(func, *args):
+    """Like run_cpu, for speculative work (pre-generation) that listeners must never queue behind."""
+    return await _run("background", func, *args)
+
+
+def executor_stats() -> dict:
+    return {kind: stats.as_dict() for kind, stats in _stats.items()}
+
+
+def shutdown_executors():
+    for pool in _pools.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import subprocess
+import uuid
+from .audio_service import ffmpeg_path
+from ..utils.file_utils import content_hash, FINGERPRINT_LENGTH
+from ..config import GENERATED_DIR, HLS_DIR, HLS_SEGMENT_SECONDS
+
+PLAYLIST_NAME = "index.m3u8"
+
+
+def _package_name(filename: str) -> str:
+    # Keyed by content, so a file regenerated under the same name gets a fresh package
+    digest = content_hash(os.path.join(GENERATED_DIR, filename))
+    return f"{os.path.splitext(filename)[0]}-{digest[:FINGERPRINT_LENGTH]}"
+
+
+def _playlist_path(name: str):
+    if os.path.exists(os.path.join(HLS_DIR, name, PLAYLIST_NAME)):
+        return f"hls/{name}/{PLAYLIST_NAME}"
+    return None
+
+
+def playlist_path(filename: str):
+    """Path of the playlist packaged from the file's current content, relative to GENERATED_DIR, if it exists."""
+    return _playlist_path(_package_name(filename))
+
+
+def package_hls(filename: str):
+    """Cut GENERATED_DIR/filename into HLS_SEGMENT_SECONDS segments plus a VOD playlist.
+
+    The MP3 frames are copied into MPEG-TS segments without re-encoding, into a
+    directory named after the MP3's content hash, so a file regenerated under
+    the same name is repackaged instead of serving stale segments. Returns
+    the playlist path relative to GENERATED_DIR, or None when ffmpeg is unavailable.
+    """
+    name = _package_name(filename)
+    existing = _playlist_path(name)
+    if existing or not ffmpeg_path():
+        return existing
+
+    package_dir = os.path.join(HLS_DIR, name)
+    # Built in a temp directory and renamed, so a playlist never references missing segments
+    tmp_dir = f"{package_dir}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_dir)
+    try:
+        result = subprocess.run([
+            ffmpeg_path(), "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+            "-i", os.path.join(GENERATED_DIR, filename),
+            "-map", "0:a", "-c:a", "copy",
+            "-f", "hls",
+            "-hls_time", str(HLS_SEGMENT_SECONDS),
+            "-hls_playlist_type", "vod",
+            "-hls_segment_filename", os.path.join(tmp_dir, "segment_%05d.ts"),
+            os.path.join(tmp_dir, PLAYLIST_NAME),
+        ], capture_output=True)
+        if result.returncode != 0:
+            error = result.stderr.decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"ffmpeg HLS packaging failed: {error}")
+
+        try:
+            os.replace(tmp_dir, package_dir)
+        except OSError:
+            # Another worker finished the same package first
+            if not os.path.exists(os.path.join(package_dir, PLAYLIST_NAME)):
+                raise
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"Packaged HLS playlist for {filename}")
+    return _playlist_path(name)
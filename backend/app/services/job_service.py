@@ -0,0 +1,89 @@
+import asyncio
+import time
+import uuid
+from .executor_service import run_io
+from .coordination_service import save_job, delete_job, load_job, prune_jobs
+from ..config import JOB_WORKERS, JOB_QUEUE_MAXSIZE, JOB_HISTORY_LIMIT
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """A bounded asyncio queue drained by a fixed pool of worker tasks.
+
+    Each job runs `handler(*args)`, which returns the URL of the finished
+    audio; the job record tracks queued -> running -> done/failed. Jobs run in
+    the worker that accepted them, but their records live in the coordination
+    registry, so a status poll can land on any worker.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, maxsize: int = JOB_QUEUE_MAXSIZE,
+                 history_limit: int = JOB_HISTORY_LIMIT):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.history_limit = history_limit
+        self._queue = None
+        self._tasks = []
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, handler, *args) -> dict:
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "url": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        if self._queue.full():
+            raise JobQueueFull(f"Job queue is full ({self.maxsize} waiting)")
+
+        # Recorded before it is queued, so a worker's later updates always follow it
+        await run_io(save_job, job)
+        try:
+            self._queue.put_nowait((job, handler, args))
+        except asyncio.QueueFull:
+            await run_io(delete_job, job["id"])
+            raise JobQueueFull(f"Job queue is full ({self.maxsize} waiting)")
+        return job
+
+    async def get(self, job_id: str):
+        return await run_io(load_job, job_id)
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self):
+        while True:
+            job, handler, args = await self._queue.get()
+            job["status"] = "running"
+            try:
+                await run_io(save_job, job)
+                job["url"] = await handler(*args)
+                job["status"] = "done"
+            except Exception as e:
+                print(f"Job {job['id']} failed: {e}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                job["finished_at"] = time.time()
+                self._queue.task_done()
+            try:
+                await run_io(save_job, job)
+                await run_io(prune_jobs, self.history_limit)
+            except Exception as e:
+                print(f"Could not record job {job['id']}: {e}")
+
+
+job_queue = JobQueue()
@@ -0,0 +1,132 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from ..config import METRICS_PREFIX, METRICS_STAGE_BUCKETS
+
+# "tts" is upstream request time only; "tts_wait" is time queued for a TTS slot or the rate cap
+STAGES = ("pdf_extraction", "tts_wait", "tts", "mixing", "hls_packaging", "file_io")
+
+COUNTERS = {
+    "audio_map_hits": "Chapter requests answered from the audio map",
+    "fallback_generations": "Chapter requests that fell back to on-the-fly generation",
+    "synthesis_cache_hits": "Synthesis lookups served by an existing content-addressed file",
+    "synthesis_cache_misses": "Synthesis lookups that had to synthesize",
+}
+
+GAUGES = {
+    "generations_in_flight": "Chapter syntheses currently running",
+    "foreground_generations": "Listener requests currently waiting on generated audio",
+}
+
+# Observations come from the event loop and from executor threads
+_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, label: str, label_values=(), buckets=METRICS_STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self.series = {}
+        # Known label values are exported from the start, so rates work before the first observation
+        for label_value in label_values:
+            self.series[label_value] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+
+    def observe(self, label_value: str, value: float) -> None:
+        with _lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self, extra_labels: str = "") -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            for label_value, series in sorted(self.series.items()):
+                labels = f'{extra_labels}{self.label}="{label_value}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+                lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]:.6f}')
+                lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return lines
+
+    def summary(self) -> dict:
+        with _lock:
+            return {
+                label_value: {
+                    "count": series["count"],
+                    "total_seconds": round(series["sum"], 3),
+                    "avg_seconds": round(series["sum"] / series["count"], 3) if series["count"] else 0.0,
+                }
+                for label_value, series in sorted(self.series.items())
+            }
+
+
+stage_seconds = Histogram(
+    f"{METRICS_PREFIX}_stage_duration_seconds",
+    "Time spent in each chapter production stage",
+    "stage",
+    STAGES,
+)
+_counters = dict.fromkeys(COUNTERS, 0)
+_gauges = dict.fromkeys(GAUGES, 0)
+
+
+@contextmanager
+def time_stage(stage: str):
+    """Record the wall time of the enclosed block (sync or async code) under `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(stage, time.perf_counter() - started)
+
+
+def increment(name: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[name] += amount
+
+
+def counter_value(name: str) -> int:
+    return _counters[name]
+
+
+def gauge_value(name: str) -> int:
+    return _gauges[name]
+
+
+@contextmanager
+def track_in_flight(name: str):
+    with _lock:
+        _gauges[name] += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _gauges[name] -= 1
+
+
+def render_metrics() -> str:
+    """This worker's metrics; under `uvicorn --workers N` each worker keeps its own, told apart by `pid`."""
+    pid = f'pid="{os.getpid()}"'
+    lines = []
+    for name, help_text in COUNTERS.items():
+        metric = f"{METRICS_PREFIX}_{name}_total"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter", f"{metric}{{{pid}}} {_counters[name]}"]
+    for name, help_text in GAUGES.items():
+        metric = f"{METRICS_PREFIX}_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge", f"{metric}{{{pid}}} {_gauges[name]}"]
+    lines += stage_seconds.render(f"{pid},")
+    return "\n".join(lines) + "\n"
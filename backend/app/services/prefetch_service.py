@@ -0,0 +1,138 @@
+import asyncio
+import os
+from collections import OrderedDict
+from .story_generator import next_episodes
+from .synthesis_cache import synthesize_cached, cached_filename
+from .executor_service import run_background, run_io
+from .coordination_service import foreground_generation_count
+from .metrics_service import gauge_value
+from .audio_map_service import find_variant
+from ..utils.concurrency_utils import cancel_unshared
+from ..utils.file_utils import find_chapter_text
+from ..config import (
+    GENERATED_DIR, PREFETCH_AHEAD, PREFETCH_QUEUE_MAXSIZE, PREFETCH_MAX_FOREGROUND, PREFETCH_CHECK_SECONDS,
+)
+
+
+class ChapterPrefetcher:
+    """Pre-generates the chapters that follow the one a listener just started.
+
+    One chapter is produced at a time, and only while no more than
+    PREFETCH_MAX_FOREGROUND listener generations are in progress, both in this
+    worker and across all workers sharing the coordination registry; when
+    foreground load rises the running pre-generation is cancelled (unless a
+    listener has already joined it) and the pending ones wait for the next idle moment.
+    """
+
+    def __init__(self, ahead: int = PREFETCH_AHEAD, max_pending: int = PREFETCH_QUEUE_MAXSIZE,
+                 max_foreground: int = PREFETCH_MAX_FOREGROUND, check_interval: float = PREFETCH_CHECK_SECONDS):
+        self.ahead = ahead
+        self.max_pending = max_pending
+        self.max_foreground = max_foreground
+        self.check_interval = check_interval
+        self.pending = OrderedDict()  # (title, voice_gender, rate) -> None, oldest first
+        self.current = None
+        self._current_key = None
+        self.stats = {"scheduled": 0, "generated": 0, "already_cached": 0, "no_text": 0, "cancelled": 0, "dropped": 0, "failed": 0}
+        self._wake = None
+        self._task = None
+
+    def schedule(self, title: str, voice_gender: str, rate: str, audio_map: dict) -> list:
+        """Queue the chapters after `title` with no audio yet in this voice and rate; returns the titles queued."""
+        queued = []
+        for next_title in next_episodes(title, self.ahead):
+            job = (next_title, voice_gender, rate)
+            if find_variant(audio_map.get(next_title), voice_gender, rate) or job in self.pending or job == self.current:
+                continue
+            if len(self.pending) >= self.max_pending:
+                # The listener has moved on; the oldest requests are the least likely to be played next
+                self.pending.popitem(last=False)
+                self.stats["dropped"] += 1
+            self.pending[job] = None
+            self.stats["scheduled"] += 1
+            queued.append(next_title)
+        if queued and self._wake is not None:
+            self._wake.set()
+        return queued
+
+    async def _idle(self) -> bool:
+        if gauge_value("foreground_generations") > self.max_foreground:
+            return False
+        # Other workers' listener generations; their pre-generations are marked background
+        return await run_io(foreground_generation_count) <= self.max_foreground
+
+    async def _prefetch(self, title: str, voice_gender: str, rate: str) -> str:
+        """Produce the chapter's audio; returns the stats counter describing the outcome."""
+        # Own pool: a cancelled extraction keeps running and must not delay listener requests
+        text = await run_background(find_chapter_text, title)
+        if text is None:
+            # Never spend TTS on placeholder narration
+            return "no_text"
+        filename = cached_filename(text, voice_gender, rate)
+        if os.path.exists(os.path.join(GENERATED_DIR, filename)):
+            return "already_cached"
+        self._current_key = filename
+        await synthesize_cached(text, voice_gender, rate, background=True)
+        print(f"Pre-generated next chapter '{title}': {filename}")
+        return "generated"
+
+    async def _run_one(self, job: tuple):
+        title = job[0]
+        self.current = job
+        task = asyncio.create_task(self._prefetch(*job))
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=self.check_interval)
+                if not task.done() and not await self._idle():
+                    # Requeued at the front: still the most likely next chapter
+                    self.pending[job] = None
+                    self.pending.move_to_end(job, last=False)
+                    if self._current_key:
+                        # Stops the synthesis itself unless a listener request has joined it
+                        cancel_unshared(self._current_key)
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    self.stats["cancelled"] += 1
+                    print(f"Pre-generation of '{title}' cancelled: foreground load")
+                    return
+            self.stats[task.result()] += 1
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f"Pre-generation of '{title}' failed: {e}")
+        finally:
+            self.current = None
+            self._current_key = None
+
+    async def _run(self):
+        while True:
+            if not self.pending:
+                self._wake.clear()
+                await self._wake.wait()
+            if not await self._idle():
+                await asyncio.sleep(self.check_interval)
+                continue
+            job, _ = self.pending.popitem(last=False)
+            await self._run_one(job)
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "current": self.current[0] if self.current else None,
+            "pending": [title for title, _, _ in self.pending],
+            **self.stats,
+        }
+
+
+prefetcher = ChapterPrefetcher()
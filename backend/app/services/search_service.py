@@ -0,0 +1,142 @@
+import heapq
+import json
+import math
+import os
+import re
+import unicodedata
+from .story_generator import load_stories
+from ..utils.text_utils import build_title_index, resolve_title
+from ..config import (
+    STRUCTURED_CONTENT_FILE, SEARCH_TITLE_WEIGHT, SEARCH_SNIPPET_CHARS, BM25_K1, BM25_B,
+)
+
+WORD_RE = re.compile(r"\w+")
+
+
+def fold_token(token: str) -> str:
+    """'Pārvatī' -> 'parvati': the same folding fold_title applies to chapter titles."""
+    decomposed = unicodedata.normalize("NFKD", token)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text: str) -> list:
+    return [fold_token(token) for token in WORD_RE.findall(text)]
+
+
+def _iter_episode_titles(stories):
+    for category in stories:
+        for subcategory in category.get("subcategories", []):
+            yield from subcategory.get("episodes", [])
+            yield from subcategory.get("sub_series", [])
+
+
+class SearchIndex:
+    """In-memory inverted index with BM25 ranking over the parsed chapter corpus.
+
+    Postings hold per-document term frequencies (title terms count SEARCH_TITLE_WEIGHT
+    times), and each document keeps the offset of the first occurrence of every term
+    so snippets are cut without rescanning the story text.
+    """
+
+    def __init__(self, chapters: dict, stories):
+        self.docs = []
+        self.postings = {}
+        title_index = build_title_index(chapters)
+        # Chapter title -> the catalog episode title the player and audio map use
+        episodes = {}
+        for episode in _iter_episode_titles(stories):
+            chapter_title = resolve_title(title_index, episode)
+            if chapter_title:
+                episodes.setdefault(chapter_title, episode)
+
+        for chapter_title, chapter in chapters.items():
+            story = chapter.get("STORY", "") if isinstance(chapter, dict) else str(chapter)
+            term_freqs = {}
+            for term in tokenize(chapter_title):
+                term_freqs[term] = term_freqs.get(term, 0) + SEARCH_TITLE_WEIGHT
+            first_offsets = {}
+            for match in WORD_RE.finditer(story):
+                term = fold_token(match.group())
+                term_freqs[term] = term_freqs.get(term, 0) + 1
+                first_offsets.setdefault(term, match.start())
+
+            doc_id = len(self.docs)
+            self.docs.append({
+                "chapter_title": chapter_title,
+                "episode_title": episodes.get(chapter_title),
+                "story": story,
+                "length": sum(term_freqs.values()),
+                "offsets": first_offsets,
+            })
+            for term, freq in term_freqs.items():
+                self.postings.setdefault(term, []).append((doc_id, freq))
+
+        total_length = sum(doc["length"] for doc in self.docs)
+        self.avg_length = total_length / len(self.docs) if self.docs else 0.0
+        count = len(self.docs)
+        self.idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query: str, limit: int) -> list:
+        terms = list(dict.fromkeys(tokenize(query)))
+        scores = {}
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, freq in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.docs[doc_id]["length"] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+        results = []
+        for doc_id, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            doc = self.docs[doc_id]
+            results.append({
+                "chapter_title": doc["chapter_title"],
+                "episode_title": doc["episode_title"],
+                "score": round(score, 4),
+                "snippet": self._snippet(doc, terms),
+            })
+        return results
+
+    @staticmethod
+    def _snippet(doc: dict, terms: list) -> str:
+        story = doc["story"]
+        hits = [doc["offsets"][term] for term in terms if term in doc["offsets"]]
+        # Title-only matches fall back to the opening of the story
+        center = min(hits) if hits else 0
+        start = max(0, center - SEARCH_SNIPPET_CHARS // 3)
+        end = min(len(story), start + SEARCH_SNIPPET_CHARS)
+        # Widen to whole words
+        if start > 0:
+            space = story.rfind(" ", 0, start)
+            start = space + 1 if space != -1 else 0
+        if end < len(story):
+            space = story.find(" ", end)
+            end = space if space != -1 else len(story)
+        snippet = " ".join(story[start:end].split())
+        return ("…" if start > 0 else "") + snippet + ("…" if end < len(story) else "")
+
+
+# Built on first search and rebuilt when the corpus file changes
+_search_index = {"stamp": None, "index": None}
+
+
+def load_search_index() -> SearchIndex:
+    stat = os.stat(STRUCTURED_CONTENT_FILE)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    if _search_index["stamp"] != stamp:
+        with open(STRUCTURED_CONTENT_FILE, "r", encoding="utf-8") as f:
+            chapters = json.load(f)
+        _search_index.update(stamp=stamp, index=SearchIndex(chapters, load_stories()))
+    return _search_index["index"]
+
+
+def search_index_ready() -> bool:
+    """True when the current index matches the corpus on disk, i.e. a search needs no rebuild."""
+    if _search_index["index"] is None:
+        return False
+    stat = os.stat(STRUCTURED_CONTENT_FILE)
+    return _search_index["stamp"] == (stat.st_size, stat.st_mtime_ns)
@@ -1,10 +1,70 @@
+import gzip
+import hashlib
 import json
 import os
-from functools import lru_cache
 from ..config import BASE_DIR
 
-@lru_cache(maxsize=None)
+# Brotli ships in requirements.txt; an install without it still serves gzip and identity
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STORIES_PATH = os.path.join(BASE_DIR, "app", "data", "stories.json")
+
+# Parsed catalog plus its pre-rendered response variants, keyed by the file's size/mtime
+_catalog = {"stamp": None, "stories": None, "response": None, "sequence": None}
+
+
+def _render(stories) -> dict:
+    body = json.dumps(stories, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return {
+        # Strong validators: each content-coding is a different representation with its own tag
+        "etags": {encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+                  for encoding in variants},
+        "variants": variants,
+    }
+
+
+def _refresh():
+    stat = os.stat(STORIES_PATH)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    if _catalog["stamp"] != stamp:
+        with open(STORIES_PATH, "r", encoding="utf-8") as f:
+            stories = json.load(f)
+        _catalog.update(stamp=stamp, stories=stories, response=_render(stories), sequence=None)
+
+
 def load_stories():
-    stories_path = os.path.join(BASE_DIR, "app", "data", "stories.json")
-    with open(stories_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    _refresh()
+    return _catalog["stories"]
+
+
+def load_stories_response() -> dict:
+    """The catalog as {"etags": {encoding: tag}, "variants": {encoding: bytes}}, re-rendered only when stories.json changes."""
+    _refresh()
+    return _catalog["response"]
+
+
+def _episode_sequence(stories) -> dict:
+    # Each subcategory plays its episodes, then its sub-series, in catalog order
+    sequence = {}
+    for category in stories:
+        for subcategory in category.get("subcategories", []):
+            titles = [t for t in subcategory.get("episodes", []) + subcategory.get("sub_series", [])
+                      if isinstance(t, str)]
+            for i, title in enumerate(titles):
+                sequence.setdefault(title, titles[i + 1:])
+    return sequence
+
+
+def next_episodes(title: str, count: int) -> list:
+    """The `count` episodes that follow `title` within its subcategory."""
+    _refresh()
+    if _catalog["sequence"] is None:
+        _catalog["sequence"] = _episode_sequence(_catalog["stories"])
+    return _catalog["sequence"].get(title, [])[:count]
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import json
+import os
+import unicodedata
+from .tts_service import generate_speech, voice_for, DEFAULT_RATE
+from .audio_service import mix_with_ambience, mix_settings
+from .executor_service import run_io
+from .hls_service import package_hls
+from .coordination_service import generation_lock
+from .metrics_service import time_stage, increment, counter_value, track_in_flight
+from ..utils.concurrency_utils import single_flight, temp_path_for
+from ..config import GENERATED_DIR, AMBIENCE_CONFIG_VERSION
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def synthesis_key(text: str, voice_gender: str, rate: str = DEFAULT_RATE) -> str:
+    """Hash of everything that determines the output audio."""
+    material = json.dumps(
+        [normalize_text(text), voice_for(voice_gender), rate,
+         AMBIENCE_CONFIG_VERSION, mix_settings()],
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def cached_filename(text: str, voice_gender: str, rate: str = DEFAULT_RATE) -> str:
+    return f"tts_{synthesis_key(text, voice_gender, rate)[:32]}.mp3"
+
+
+async def synthesize_cached(text: str, voice_gender: str, rate: str = DEFAULT_RATE, background: bool = False) -> str:
+    """Return the filename of the mixed audio for text/voice/rate, synthesizing it on a miss.
+
+    `background` marks speculative pre-generation in the coordination registry.
+    """
+    filename = cached_filename(text, voice_gender, rate)
+    output_path = os.path.join(GENERATED_DIR, filename)
+
+    if os.path.exists(output_path):
+        increment("synthesis_cache_hits")
+        print(f"Synthesis cache hit: {filename}")
+        return filename
+
+    increment("synthesis_cache_misses")
+    # Concurrent misses share one synthesis: in this process via single-flight,
+    # across workers via the generation lock
+    await single_flight(filename, lambda: _synthesize_locked(text, voice_gender, rate, output_path, background))
+    return filename
+
+
+async def _synthesize_locked(text: str, voice_gender: str, rate: str, output_path: str,
+                             background: bool = False) -> None:
+    async with generation_lock(os.path.basename(output_path), background):
+        # Another worker may have finished it while this one waited for the lock
+        await _synthesize_to(text, voice_gender, rate, output_path)
+
+
+async def _synthesize_to(text: str, voice_gender: str, rate: str, output_path: str) -> None:
+    if os.path.exists(output_path):
+        return
+
+    with track_in_flight("generations_in_flight"):
+        speech_file = await generate_speech(text, voice_gender, rate)
+        print("TTS generation completed")
+
+        # Written under a temp name and renamed, so readers never see a partial file
+        tmp_path = temp_path_for(output_path)
+        try:
+            with time_stage("mixing"):
+                mixing = asyncio.ensure_future(run_io(mix_with_ambience, speech_file, tmp_path))
+                try:
+                    await asyncio.shield(mixing)
+                except asyncio.CancelledError:
+                    # The mixing thread cannot be interrupted; let it finish before cleaning up
+                    await asyncio.gather(mixing, return_exceptions=True)
+                    raise
+            os.replace(tmp_path, output_path)
+            print("Audio mixing completed")
+        finally:
+            os.remove(speech_file)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    print(f"Successfully generated: {os.path.basename(output_path)}")
+
+    try:
+        with time_stage("hls_packaging"):
+            await run_io(package_hls, os.path.basename(output_path))
+    except Exception as e:
+        # The MP3 is complete; /play can still package it on demand
+        print(f"HLS packaging failed: {e}")
+
+
+def cache_stats() -> dict:
+    hits = counter_value("synthesis_cache_hits")
+    misses = counter_value("synthesis_cache_misses")
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": round(hits / lookups, 4) if lookups else 0.0}
@@ -1,20 +1,174 @@
+import asyncio
 import os
+import re
 import uuid
-import edge_tts
-from ..config import VOICE_MALE, VOICE_FEMALE, GENERATED_DIR
+from ..config import (
+    VOICE_MALE, VOICE_FEMALE, GENERATED_DIR, TTS_DEFAULT_RATE,
+    TTS_SEGMENT_MAX_CHARS, TTS_SEGMENT_CONCURRENCY, TTS_SEGMENT_RETRIES,
+)
+from .metrics_service import time_stage
+from ..utils.mp3_utils import concat_mp3_files
 
-async def generate_speech(text: str, voice_gender: str = "male"):
-    voice = VOICE_MALE if voice_gender.lower() == "male" else VOICE_FEMALE
-    
-    speech_file = os.path.join(
-        GENERATED_DIR,
-        f"speech_{uuid.uuid4()}.mp3"
-    )
-    
-    # Smart stretching: slower rate for profound narration
-    communicate = edge_tts.Communicate(text, voice, rate="-10%")
+DEFAULT_RATE = TTS_DEFAULT_RATE
+# edge-tts rates are signed percentages relative to the voice's normal speed
+RATE_RE = re.compile(r"^[+-]\d{1,3}%$")
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?;:…\"'”’])\s+")
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+
+def voice_for(voice_gender: str) -> str:
+    return VOICE_MALE if voice_gender.lower() == "male" else VOICE_FEMALE
+
+
+def voice_label(voice_gender: str) -> str:
+    """The voice a request gets, as "male" or "female" (anything else is the female voice)."""
+    return "male" if voice_gender.lower() == "male" else "female"
+
+
+def check_rate(rate: str) -> str:
+    if not RATE_RE.match(rate):
+        raise ValueError(f"Invalid speaking rate {rate!r}; expected a signed percentage such as '+25%'")
+    return rate
+
+
+def _communicate(text: str, voice: str, rate: str):
+    # Imported on first synthesis; edge_tts pulls in aiohttp and friends
+    import edge_tts
+    return edge_tts.Communicate(text, voice, rate=rate)
+
+
+def _new_speech_path() -> str:
+    return os.path.join(GENERATED_DIR, f"speech_{uuid.uuid4()}.mp3")
+
+
+def split_text_segments(text: str, max_chars: int = TTS_SEGMENT_MAX_CHARS) -> list:
+    """Split text at paragraph/sentence boundaries into segments of at most max_chars."""
+    pieces = []
+    for paragraph in PARAGRAPH_RE.split(text):
+        for sentence in SENTENCE_END_RE.split(paragraph.strip()):
+            sentence = sentence.strip()
+            # A single run-on sentence longer than a segment is split between words
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+
+    segments = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            segments.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        segments.append(current)
+    return segments
+
+
+async def _synthesize_file(text: str, voice: str, rate: str) -> str:
+    speech_file = _new_speech_path()
+    communicate = _communicate(text, voice, rate)
     
     # Simple generation without complex audio processing
-    await communicate.save(speech_file)
+    try:
+        await communicate.save(speech_file)
+    except BaseException:
+        # Failed or cancelled mid-write: do not leave a partial file behind
+        if os.path.exists(speech_file):
+            os.remove(speech_file)
+        raise
     
     return speech_file
+
+
+async def _request_speech(text: str, voice: str, rate: str, semaphore, rate_limiter=None) -> str:
+    """One upstream TTS request; the wait for a slot and the rate cap is timed apart from the request."""
+    with time_stage("tts_wait"):
+        await semaphore.acquire()
+        try:
+            if rate_limiter:
+                await rate_limiter.acquire()
+        except BaseException:
+            semaphore.release()
+            raise
+    try:
+        with time_stage("tts"):
+            return await _synthesize_file(text, voice, rate)
+    finally:
+        semaphore.release()
+
+
+async def _synthesize_segment(segment: str, voice: str, rate: str, semaphore, rate_limiter=None) -> str:
+    for attempt in range(TTS_SEGMENT_RETRIES + 1):
+        try:
+            # Every upstream request takes a slot and counts against the limit, retries included
+            return await _request_speech(segment, voice, rate, semaphore, rate_limiter)
+        except Exception as e:
+            if attempt == TTS_SEGMENT_RETRIES:
+                raise
+            print(f"TTS segment failed ({e}), retrying segment only")
+            await asyncio.sleep(2 ** attempt)
+
+
+async def generate_speech(text: str, voice_gender: str = "male", rate: str = DEFAULT_RATE,
+                          semaphore=None, rate_limiter=None):
+    """Synthesize `text` to a speech file and return its path.
+
+    Pass a shared `semaphore` and/or `rate_limiter` (any object with an async
+    `acquire()`) to bound upstream TTS requests across many calls: each segment
+    is a request of its own. Each request is timed as the "tts" stage and its
+    wait for a slot or the rate cap as "tts_wait".
+    """
+    voice = voice_for(voice_gender)
+    check_rate(rate)
+    semaphore = semaphore or asyncio.Semaphore(TTS_SEGMENT_CONCURRENCY)
+    
+    segments = split_text_segments(text)
+    if len(segments) <= 1:
+        return await _request_speech(text, voice, rate, semaphore, rate_limiter)
+    
+    # Segments are synthesized concurrently; a failure retries only that segment
+    tasks = [
+        asyncio.ensure_future(_synthesize_segment(segment, voice, rate, semaphore, rate_limiter))
+        for segment in segments
+    ]
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    except asyncio.CancelledError:
+        # Cancelled (e.g. a background pre-generation giving way): drop finished segments
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for task in tasks:
+            if not task.cancelled() and task.exception() is None:
+                os.remove(task.result())
+        raise
+    segment_files = [r for r in results if isinstance(r, str)]
+    
+    try:
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+        
+        speech_file = _new_speech_path()
+        concat_mp3_files(segment_files, speech_file)
+        return speech_file
+    finally:
+        for path in segment_files:
+            os.remove(path)
+
+
+async def stream_speech(text: str, voice_gender: str = "male", rate: str = DEFAULT_RATE, communicate_factory=None):
+    """Yield MP3 bytes as the TTS service produces them.
+
+    `communicate_factory(text, voice, rate)` must return an object with an async
+    `stream()` of edge-tts style chunks; pass a fake one to run without the network.
+    """
+    factory = communicate_factory or _communicate
+    communicate = factory(text, voice_for(voice_gender), check_rate(rate))
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            yield chunk["data"]
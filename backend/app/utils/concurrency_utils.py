@@ -0,0 +1,47 @@
+import asyncio
+import uuid
+
+# key -> task currently producing that key's result, and how many callers await it
+_inflight = {}
+_waiters = {}
+
+
+async def single_flight(key, factory):
+    """Run `factory()` once per key at a time; concurrent callers await the same task."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    _waiters[key] = _waiters.get(key, 0) + 1
+    try:
+        # Shielded so one caller disconnecting does not cancel the work for the others
+        return await asyncio.shield(task)
+    finally:
+        _waiters[key] -= 1
+        if not _waiters[key]:
+            del _waiters[key]
+
+
+def cancel_unshared(key) -> bool:
+    """Cancel the in-flight task for `key` if at most one caller is waiting on it."""
+    task = _inflight.get(key)
+    if task is None or _waiters.get(key, 0) > 1:
+        return False
+    return task.cancel()
+
+
+async def wait_inflight(key) -> None:
+    """Wait for an in-flight task for `key`, if any, without propagating its errors."""
+    task = _inflight.get(key)
+    if task is not None:
+        await asyncio.wait({task})
+
+
+def inflight_count() -> int:
+    return len(_inflight)
+
+
+def temp_path_for(path: str) -> str:
+    """A unique sibling path to write to before renaming onto `path`."""
+    return f"{path}.{uuid.uuid4().hex}.tmp"
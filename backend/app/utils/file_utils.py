@@ -1,40 +1,221 @@
+import hashlib
+import json
 import os
 import re
-import pdfplumber
-from ..config import BASE_DIR
+import uuid
+from .text_utils import build_title_index, resolve_title
+from ..config import PDF_SOURCE_FILE, PDF_INDEX_FILE, GENERATED_DIR
 
-def extract_chapter_text(chapter_title: str) -> str:
-    assets_dir = os.path.join(BASE_DIR, "assets")
-    pdf_path = os.path.join(assets_dir, "mythology_source.pdf")
-    extracted_text = ""
+PDF_INDEX_VERSION = 1
+FINGERPRINT_LENGTH = 16  # hex digits of the content hash in an /audio URL's `v`
+
+CHAPTER_HEADER_RE = re.compile(r"^CHAPTER_TITLE:\s*(.+?)\s*$", re.MULTILINE)
+STORY_BODY_RE = re.compile(r"--- STORY START ---\s*(.*?)\s*--- STORY END\s*---", re.DOTALL)
+SECTION_HEADING_RE = re.compile(r"^[A-Z][A-Z\s]{5,}$", re.MULTILINE)
+
+# In-process copy of the on-disk index, its folded chapter titles, plus ranges resolved by page scan
+_pdf_index = None
+_title_index = None
+_scanned_ranges = {}
+
+# path -> (size, mtime_ns, sha256) for files served under /audio
+_content_hashes = {}
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_stamp(path: str) -> dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def content_hash(path: str, stat_result: os.stat_result = None) -> str:
+    """SHA-256 of a file's content, recomputed only when its size or mtime changes.
+
+    Pass the file's `stat_result` when the caller already has one.
+    """
+    stat = stat_result or os.stat(path)
+    cached = _content_hashes.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    digest = _file_sha256(path)
+    _content_hashes[path] = (stat.st_size, stat.st_mtime_ns, digest)
+    return digest
+
+
+def audio_url(relative_path: str, digest: str) -> str:
+    """Fingerprinted URL for a file under GENERATED_DIR; the `v` component makes it immutable."""
+    return f"/audio/{relative_path}?v={digest[:FINGERPRINT_LENGTH]}"
+
+
+def audio_path(relative_path: str) -> str:
+    return os.path.join(GENERATED_DIR, relative_path)
+
+
+def write_json_atomic(path: str, data, indent=None) -> None:
+    """Write JSON to a temp file next to `path` and rename it into place."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _chapter_ranges(document: str) -> dict:
+    """Map each CHAPTER_TITLE header to the (start, end) offsets of its story body."""
+    headers = list(CHAPTER_HEADER_RE.finditer(document))
+    ranges = {}
+    for i, header in enumerate(headers):
+        block_start = header.end()
+        block_end = headers[i + 1].start() if i + 1 < len(headers) else len(document)
+        body = STORY_BODY_RE.search(document, block_start, block_end)
+        if body:
+            start, end = body.span(1)
+        else:
+            start, end = block_start, block_end
+        ranges.setdefault(header.group(1).casefold(), [start, end])
+    return ranges
+
+
+def build_pdf_index(pdf_path: str = None) -> dict:
+    # Imported here: only an index rebuild needs the (slow to import) PDF stack
+    import pdfplumber
+
+    pdf_path = pdf_path or PDF_SOURCE_FILE
 
+    stamp = _source_stamp(pdf_path)
+    with pdfplumber.open(pdf_path) as pdf:
+        pages = [(page.extract_text() or "").strip() for page in pdf.pages]
+
+    page_starts = []
+    offset = 0
+    for text in pages:
+        page_starts.append(offset)
+        offset += len(text) + 1
+    document = "\n".join(pages)
+
+    return {
+        "version": PDF_INDEX_VERSION,
+        "source": {**stamp, "sha256": _file_sha256(pdf_path)},
+        "page_starts": page_starts,
+        "document": document,
+        "chapters": _chapter_ranges(document),
+    }
+
+
+def load_pdf_index(pdf_path: str = None, index_path: str = None) -> dict:
+    """Return the compiled page/chapter index, rebuilding it when the PDF changes."""
+    global _pdf_index, _title_index, _scanned_ranges
+
+    # Resolved per call so the source can be redirected (e.g. to benchmark fixtures)
+    pdf_path = pdf_path or PDF_SOURCE_FILE
+    index_path = index_path or PDF_INDEX_FILE
+    stamp = _source_stamp(pdf_path)
+    if _pdf_index is not None and _pdf_index["source"]["size"] == stamp["size"] \
+            and _pdf_index["source"]["mtime_ns"] == stamp["mtime_ns"]:
+        return _pdf_index
+
+    index = None
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"PDF index unreadable, rebuilding: {e}")
+
+    if index is not None and index.get("version") == PDF_INDEX_VERSION:
+        source = index["source"]
+        if source["size"] != stamp["size"] or source["mtime_ns"] != stamp["mtime_ns"]:
+            # Touched but possibly unchanged (e.g. re-copied): only the hash decides
+            if source["size"] == stamp["size"] and source["sha256"] == _file_sha256(pdf_path):
+                index["source"].update(stamp)
+                write_json_atomic(index_path, index)
+            else:
+                index = None
+    else:
+        index = None
+
+    if index is None:
+        print("Building PDF page index...")
+        index = build_pdf_index(pdf_path)
+        write_json_atomic(index_path, index)
+        print(f"PDF index built: {len(index['page_starts'])} pages, {len(index['chapters'])} chapters")
+
+    _pdf_index = index
+    _title_index = None
+    _scanned_ranges = {}
+    return index
+
+
+def _resolve_chapter_range(index: dict, chapter_title: str):
+    """Catalog titles ('6. THE PARASURĀMA AVATĀRA') resolved to CHAPTER_TITLE headers, else a page scan."""
+    global _title_index
+    chapter_range = index["chapters"].get(chapter_title.casefold())
+    if chapter_range is not None:
+        return chapter_range
+
+    if _title_index is None:
+        _title_index = build_title_index(index["chapters"])
+    header = resolve_title(_title_index, chapter_title)
+    if header is not None:
+        return index["chapters"][header]
+
+    key = chapter_title.casefold()
+    if key not in _scanned_ranges:
+        _scanned_ranges[key] = _scan_chapter_range(index, chapter_title)
+    return _scanned_ranges[key]
+
+
+def _scan_chapter_range(index: dict, chapter_title: str):
+    """Locate a title that is not a CHAPTER_TITLE header by scanning the cached pages."""
+    document = index["document"]
+    page_starts = index["page_starts"]
+    title_re = re.compile(re.escape(chapter_title), re.IGNORECASE)
+
+    start = None
+    end = len(document)
+    for i, page_start in enumerate(page_starts):
+        page_end = page_starts[i + 1] - 1 if i + 1 < len(page_starts) else len(document)
+        if start is None:
+            match = title_re.search(document, page_start, page_end)
+            if match:
+                start = match.end()
+        elif SECTION_HEADING_RE.search(document[page_start:page_end]):
+            end = page_start
+            break
+
+    if start is None:
+        return None
+    return [start, end]
+
+
+def find_chapter_text(chapter_title: str):
+    """The chapter's text from the PDF, or None when the PDF has no (usable) text for it."""
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            found = False
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-
-                if re.search(re.escape(chapter_title), text, re.IGNORECASE):
-                    found = True
-                    match = re.search(
-                        re.escape(chapter_title) + r"(.*)",
-                        text,
-                        re.DOTALL | re.IGNORECASE
-                    )
-                    if match:
-                        extracted_text += match.group(1).strip()
-                elif found:
-                    if re.search(r"^[A-Z][A-Z\s]{5,}$", text, re.MULTILINE):
-                        break
-                    extracted_text += "\n" + text.strip()
-
-        extracted_text = re.sub(r"\n\s*\n", "\n", extracted_text).strip()
-
-        if len(extracted_text) > 200:
-            return extracted_text
+        index = load_pdf_index()
+        chapter_range = _resolve_chapter_range(index, chapter_title)
+        if chapter_range:
+            start, end = chapter_range
+            extracted_text = re.sub(r"\n\s*\n", "\n", index["document"][start:end]).strip()
+            if len(extracted_text) > 200:
+                return extracted_text
 
     except Exception as e:
         print(f"PDF parsing error: {e}")
+    return None
+
+
+def extract_chapter_text(chapter_title: str) -> str:
+    text = find_chapter_text(chapter_title)
+    if text is not None:
+        return text
 
     # Fallback text
     return (
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import time
+
+# fcntl on POSIX; msvcrt on Windows, which has no shared locks (they become exclusive)
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+DEFAULT_POLL_SECONDS = 0.1
+
+
+class FileLock:
+    """Advisory lock on a lock file, shared between processes (and threads).
+
+    The OS drops the lock when the holder exits, so a crashed worker can never
+    leave a generation or the manifest locked.
+    """
+
+    def __init__(self, path: str, shared: bool = False):
+        self.path = path
+        self.shared = shared
+        self._fd = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+                fcntl.flock(fd, flags if blocking else flags | fcntl.LOCK_NB)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise BlockingIOError(self.path)
+                        time.sleep(DEFAULT_POLL_SECONDS)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    async def acquire_async(self, poll: float = DEFAULT_POLL_SECONDS) -> None:
+        """Wait for the lock without blocking the event loop (or an executor thread)."""
+        while not self.acquire(blocking=False):
+            await asyncio.sleep(poll)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def locked_elsewhere(self) -> bool:
+        """True when another holder has the lock right now (never blocks)."""
+        if not self.acquire(blocking=False):
+            return True
+        self.release()
+        return False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,119 @@
+import json
+import os
+from .file_utils import write_json_atomic
+from .lock_utils import FileLock
+
+# Journal entries applied before the snapshot is rewritten
+DEFAULT_COMPACT_EVERY = 25
+
+
+def journal_path_for(map_path: str) -> str:
+    return os.path.splitext(map_path)[0] + ".journal"
+
+
+def lock_path_for(map_path: str) -> str:
+    return os.path.splitext(map_path)[0] + ".lock"
+
+
+class AudioManifest:
+    """The audio map as a JSON snapshot plus an append-only journal of newer entries.
+
+    Appends cost one small line write regardless of library size; the snapshot
+    (the file the server reads) is only rewritten on compaction, and always via
+    temp-file-and-rename so readers never see a partial file.
+
+    Writers in any process (batch runs, server workers, the map builder) hold an
+    exclusive lock on a sibling .lock file; readers take it shared, so a snapshot
+    and its journal are always read as a consistent pair.
+    """
+
+    def __init__(self, map_path: str, compact_every: int = DEFAULT_COMPACT_EVERY):
+        self.map_path = map_path
+        self.journal_path = journal_path_for(map_path)
+        self.lock_path = lock_path_for(map_path)
+        self.compact_every = compact_every
+        self.entries = {}
+        self._pending = 0
+
+    def load(self) -> dict:
+        """Read the snapshot and replay any journal entries on top of it."""
+        with FileLock(self.lock_path, shared=True):
+            return self._load()
+
+    def _load(self) -> dict:
+        entries = {}
+        if os.path.exists(self.map_path):
+            with open(self.map_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+
+        pending = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line torn by a crash mid-append; later appends start on a fresh line
+                        continue
+                    _apply(entries, record)
+                    pending += 1
+
+        self.entries = entries
+        self._pending = pending
+        return entries
+
+    def append(self, title: str, entry: dict, variant: str = None) -> None:
+        """Record `entry` for `title`, or only its `variant` (the title's other variants are kept)."""
+        record = {"title": title, "entry": entry}
+        if variant is not None:
+            record["variant"] = variant
+        line = json.dumps(record, ensure_ascii=False)
+        with FileLock(self.lock_path):
+            with open(self.journal_path, "a+b") as f:
+                # A crash mid-append leaves a line without its newline; never glue onto it
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = "\n" + line
+                f.write((line + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+        _apply(self.entries, record)
+        self._pending += 1
+        if self.compact_every and self._pending >= self.compact_every:
+            self.compact()
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and truncate it."""
+        with FileLock(self.lock_path):
+            # Re-read first: other processes may have journaled entries this one never saw
+            self._load()
+            self._write_snapshot()
+
+    def replace(self, entries: dict) -> None:
+        """Swap in a complete map (e.g. a rebuilt one), discarding the journal."""
+        with FileLock(self.lock_path):
+            self.entries = dict(entries)
+            self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        write_json_atomic(self.map_path, self.entries, indent=4)
+        # Replaying a journal over a snapshot that already contains it is harmless,
+        # so a crash between these two steps loses nothing
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._pending = 0
+
+
+def _apply(entries: dict, record: dict) -> None:
+    if "variant" in record:
+        entry = entries.setdefault(record["title"], {})
+        entry.setdefault("variants", {})[record["variant"]] = record["entry"]
+    else:
+        entries[record["title"]] = record["entry"]
+
+
+def load_audio_map(map_path: str) -> dict:
+    """Current audio map (snapshot + journal) without modifying anything on disk."""
+    return AudioManifest(map_path).load()
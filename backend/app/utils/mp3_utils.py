@@ -0,0 +1,49 @@
+import os
+
+ID3V1_SIZE = 128
+COPY_BLOCK = 1024 * 1024
+
+
+def _frame_data_range(f, file_size: int):
+    """(start, end) of the MPEG frame data in an MP3, excluding ID3v2/ID3v1 tags."""
+    start = 0
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b"ID3":
+        # Tag size is a 28-bit syncsafe integer, plus a 10 byte footer if flagged
+        size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        start = 10 + size + (10 if header[5] & 0x10 else 0)
+
+    end = file_size
+    if file_size - start >= ID3V1_SIZE:
+        f.seek(file_size - ID3V1_SIZE)
+        if f.read(3) == b"TAG":
+            end = file_size - ID3V1_SIZE
+
+    # Skip any padding between the tag and the first frame sync
+    f.seek(start)
+    window = f.read(4096)
+    for i in range(len(window) - 1):
+        if window[i] == 0xFF and window[i + 1] & 0xE0 == 0xE0:
+            start += i
+            break
+    return start, max(start, end)
+
+
+def concat_mp3_files(input_paths, output_path: str) -> None:
+    """Join MP3 files by concatenating their frames, without decoding or re-encoding.
+
+    The inputs must share sample rate and channel layout (true for segments
+    from the same TTS voice). Copies in fixed-size blocks, so memory is constant.
+    """
+    with open(output_path, "wb") as out:
+        for path in input_paths:
+            with open(path, "rb") as f:
+                start, end = _frame_data_range(f, os.path.getsize(path))
+                f.seek(start)
+                remaining = end - start
+                while remaining > 0:
+                    block = f.read(min(COPY_BLOCK, remaining))
+                    if not block:
+                        break
+                    out.write(block)
+                    remaining -= len(block)
@@ -0,0 +1,47 @@
+import os
+import stat
+from urllib.parse import parse_qs
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from .file_utils import content_hash, FINGERPRINT_LENGTH
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """StaticFiles with strong content-hash ETags and immutable caching for fingerprinted URLs.
+
+    A request carrying exactly the `?v=` fingerprint that audio_url issues for the
+    file's current content is cacheable forever; anything else must revalidate,
+    which If-None-Match turns into a 304.
+    """
+
+    def lookup_path(self, path: str):
+        # Starlette runs this in a worker thread: hashing here keeps file reads off the event loop
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+            try:
+                content_hash(full_path, stat_result)
+            except OSError:
+                # Removed or replaced since the lookup
+                return "", None
+        return full_path, stat_result
+
+    def file_response(self, full_path: os.PathLike, stat_result: os.stat_result, scope,
+                      status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        # Cached by lookup_path under this same stat, so no file read here
+        digest = content_hash(os.fspath(full_path), stat_result)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["etag"] = f'"{digest}"'
+
+        version = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v", [""])[0]
+        fingerprinted = version == digest[:FINGERPRINT_LENGTH]
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
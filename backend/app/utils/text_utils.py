@@ -0,0 +1,71 @@
+import re
+import unicodedata
+
+NUMBERING_RE = re.compile(r"^\s*\d+[a-z]?\.\s*", re.IGNORECASE)
+PARENTHETICAL_RE = re.compile(r"\(([^)]*)\)")
+AVATAR_RE = re.compile(r"^(?:the )?(.+?)(?: or .+?)? (avatara|avatar)$")
+
+# Episode titles that are told under a different chapter name in the source PDF
+TITLE_ALIASES = {
+    "brahma": "brahman",
+}
+
+
+def fold_title(title: str) -> str:
+    """Diacritic-fold, lowercase and strip numbering/punctuation: '8a. THE BALARĀMA' -> 'the balarama'."""
+    decomposed = unicodedata.normalize("NFKD", title)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    stripped = NUMBERING_RE.sub("", stripped)
+    return " ".join(re.findall(r"[a-z0-9]+", stripped))
+
+
+def _lookup_keys(title: str) -> list:
+    """Folded keys for a title, most specific first."""
+    full = fold_title(title)
+    bare = fold_title(PARENTHETICAL_RE.sub(" ", title))
+    keys = [full, bare]
+    for key in (full, bare):
+        avatar = AVATAR_RE.match(key)
+        if avatar:
+            keys.append(f"{avatar.group(1)} {avatar.group(2)}")
+        if key.startswith("the "):
+            keys.append(key[4:])
+    return [key for key in dict.fromkeys(keys) if key]
+
+
+def _parenthetical_aliases(title: str) -> list:
+    aliases = []
+    for inner in PARENTHETICAL_RE.findall(title):
+        inner = re.sub(r"also known as", ",", inner, flags=re.IGNORECASE)
+        aliases.extend(fold_title(part) for part in inner.split(","))
+    return [alias for alias in aliases if alias and alias != "etc"]
+
+
+def build_title_index(titles) -> dict:
+    """Compile chapter titles into a folded-key -> title map for O(1) resolution."""
+    titles = list(titles)
+    index = {}
+    # Exact folded titles win over shortened forms, which win over aliases
+    for title in titles:
+        index.setdefault(fold_title(title), title)
+    for title in titles:
+        for key in _lookup_keys(title):
+            index.setdefault(key, title)
+    for title in titles:
+        for alias in _parenthetical_aliases(title):
+            index.setdefault(alias, title)
+    for alias, target in TITLE_ALIASES.items():
+        if target in index:
+            index.setdefault(alias, index[target])
+    return index
+
+
+def resolve_title(index: dict, title: str):
+    """Return the indexed title matching an episode title, or None."""
+    for key in _lookup_keys(title):
+        if key in index:
+            return index[key]
+        alias = TITLE_ALIASES.get(key)
+        if alias in index:
+            return index[alias]
+    return None
@@ -0,0 +1,169 @@
+"""Deterministic synthetic fixtures for the benchmark suite"""
+import json
+import os
+import random
+import textwrap
+
+# Invented names: ASCII so the standard Helvetica font can draw them, and with
+# numbering and avatar suffixes like the real catalog so resolution does real work
+NAME_SYLLABLES = ["ra", "ma", "ka", "vi", "shu", "dha", "ga", "na", "pra", "ti", "sa", "va", "ja", "la"]
+FILLER_WORDS = (
+    "the of and in to a was he she it his her that with by as from on they were this "
+    "gods demons sage river mountain heaven earth battle boon wisdom king queen temple "
+    "ocean serpent chariot arrow sacred hymn fire offering dawn night forest kingdom"
+).split()
+
+LINES_PER_PAGE = 60
+LINE_WIDTH = 95
+
+# One MPEG-1 Layer III frame (128 kbps, 44.1 kHz): header plus zeroed payload
+MP3_FRAME = b"\xff\xfb\x90\x00" + bytes(413)
+
+
+def chapter_names(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    names = []
+    while len(names) < count:
+        name = "".join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 4))).upper()
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def story_text(rng: random.Random, words: int) -> str:
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 20))
+        sentence = " ".join(rng.choice(FILLER_WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def build_corpus(chapters: int = 40, words_per_story: int = 600, seed: int = 7) -> dict:
+    """{chapter title: story} with every chapter title appearing in the text of another story"""
+    rng = random.Random(seed)
+    names = chapter_names(chapters, seed)
+    corpus = {}
+    for i, name in enumerate(names):
+        story = story_text(rng, words_per_story)
+        title = f"{name} AVATARA" if i % 5 == 0 else name
+        corpus[title] = f"{story} Later {names[(i + 1) % len(names)].title()} came to the sage."
+    return corpus
+
+
+def corpus_lines(corpus: dict) -> list:
+    lines = []
+    for title, story in corpus.items():
+        lines.append(f"CHAPTER_TITLE: {title}")
+        lines.append("--- STORY START ---")
+        lines.extend(textwrap.wrap(story, LINE_WIDTH))
+        lines.append("--- STORY END ---")
+        lines.append("")
+    return lines
+
+
+def corpus_text(corpus: dict) -> str:
+    """The corpus as the flat text parse_chapters_from_text expects"""
+    return "\n".join(corpus_lines(corpus))
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, lines: list) -> None:
+    """Write a minimal text-only PDF (Helvetica, one line per Tj) that pdfplumber can read"""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then (page, content) per page
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    kids = []
+    for i, page_lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * i, 5 + 2 * i
+        kids.append(f"{page_id} 0 R")
+        body = "BT /F1 9 Tf 11 TL 40 800 Td\n"
+        body += "".join(f"({_pdf_escape(line)}) Tj T*\n" for line in page_lines) + "ET"
+        stream = body.encode("latin-1")
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode("ascii")
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("ascii")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+    xref_at = len(out)
+    count = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % count
+    for number in range(1, count):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref_at)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def episode_titles(corpus: dict) -> list:
+    """Catalog-style titles for the corpus: numbered, title case, some with an avatar suffix"""
+    titles = []
+    for i, name in enumerate(corpus):
+        if name.endswith(" AVATARA"):
+            titles.append(f"{i + 1}. THE {name}")
+        else:
+            titles.append(f"{i + 1}. {name.title()}")
+    return titles
+
+
+def build_stories(titles: list, per_subcategory: int = 8) -> list:
+    subcategories = [
+        {"title": f"Series {n + 1}", "episodes": titles[i:i + per_subcategory]}
+        for n, i in enumerate(range(0, len(titles), per_subcategory))
+    ]
+    return [{"title": "Synthetic", "description": "Benchmark fixture", "image": "", "subcategories": subcategories}]
+
+
+def write_stories(path: str, stories: list) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stories, f, indent=2, ensure_ascii=False)
+
+
+def audio_filename(title: str, i: int) -> str:
+    # Mix the naming schemes found in static/audio: category prefixes, numbering, '_' for spaces
+    stem = title.split(". ", 1)[1].replace(" ", "_")
+    prefix = ("general_", "inferior_rishis_", "")[i % 3]
+    return f"{prefix}{i + 1}_{stem}.mp3"
+
+
+def write_audio_dir(directory: str, titles: list, frames: int = 64) -> dict:
+    """A fake MP3 per title (plus unrelated files); returns {title: filename}"""
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for i, title in enumerate(titles):
+        files[title] = audio_filename(title, i)
+        with open(os.path.join(directory, files[title]), "wb") as f:
+            f.write(MP3_FRAME * frames)
+    for i in range(len(titles) // 4):
+        with open(os.path.join(directory, f"tts_{i:032x}.mp3"), "wb") as f:
+            f.write(MP3_FRAME)
+    return files
+
+
+class StubCommunicate:
+    """Stands in for edge_tts.Communicate: MP3 frames in proportion to the text, no network"""
+
+    def __init__(self, text: str, voice: str, rate: str = "+0%"):
+        self.frames = max(1, len(text) // 100)
+
+    async def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(MP3_FRAME * self.frames)
+
+    async def stream(self):
+        for _ in range(self.frames):
+            yield {"type": "audio", "data": MP3_FRAME}
@@ -0,0 +1,299 @@
+"""Micro-benchmarks for parsing, title resolution, audio map building and request paths"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_REPEAT = 7
+DEFAULT_TOLERANCE = 1.5  # a case regresses when its median exceeds baseline * tolerance
+
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+# main.py mounts ../frontend/public/images relative to the backend directory
+os.chdir(BACKEND_DIR)
+
+import fixtures  # noqa: E402
+import generate_audio_map  # noqa: E402
+import pdf_content_parser  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from backend.app.main import app  # noqa: E402
+from backend.app.services import story_generator, tts_service  # noqa: E402
+from backend.app.services.executor_service import shutdown_executors  # noqa: E402
+from backend.app.utils import file_utils  # noqa: E402
+
+
+def measure(func, repeat: int, number: int = 1, setup=None) -> dict:
+    """Time `func` `number` times per round for `repeat` rounds; per-call stats in microseconds"""
+    per_call = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        per_call.append((time.perf_counter() - started) / number * 1e6)
+    return {
+        "median_us": round(statistics.median(per_call), 2),
+        "min_us": round(min(per_call), 2),
+        "max_us": round(max(per_call), 2),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def redirect_paths(stack: contextlib.ExitStack, overrides: dict) -> None:
+    """Point module-level path constants (imported by value) at the fixture workspace"""
+    for name, module in list(sys.modules.items()):
+        if module is None or not (name.startswith("backend.app") or name == "pdf_content_parser"):
+            continue
+        for attr, value in overrides.items():
+            if hasattr(module, attr):
+                stack.enter_context(mock.patch.object(module, attr, value))
+
+
+class Workspace:
+    """Synthetic PDF, catalog, audio directory and generated-audio directory in a temp dir"""
+
+    def __init__(self, root: str, chapters: int):
+        self.root = root
+        self.corpus = fixtures.build_corpus(chapters)
+        self.text = fixtures.corpus_text(self.corpus)
+        self.episodes = fixtures.episode_titles(self.corpus)
+        self.stories = fixtures.build_stories(self.episodes)
+
+        self.pdf_path = os.path.join(root, "source.pdf")
+        self.stories_path = os.path.join(root, "stories.json")
+        self.audio_dir = os.path.join(root, "audio")
+        self.generated_dir = os.path.join(root, "generated")
+        self.map_path = os.path.join(root, "audio_map.json")
+        self.pdf_index_path = os.path.join(root, "pdf_index.json")
+        self.lock_dir = os.path.join(root, "locks")
+        os.makedirs(self.generated_dir)
+        os.makedirs(self.lock_dir)
+
+        fixtures.write_pdf(self.pdf_path, fixtures.corpus_lines(self.corpus))
+        fixtures.write_stories(self.stories_path, self.stories)
+        self.audio_files = fixtures.write_audio_dir(self.audio_dir, self.episodes)
+
+    def overrides(self) -> dict:
+        return {
+            "PDF_PATH": self.pdf_path,
+            "PDF_SOURCE_FILE": self.pdf_path,
+            "PDF_INDEX_FILE": self.pdf_index_path,
+            "STORIES_PATH": self.stories_path,
+            "GENERATED_DIR": self.generated_dir,
+            "HLS_DIR": os.path.join(self.generated_dir, "hls"),
+            "AUDIO_MAP_FILE": self.map_path,
+            "LOCK_DIR": self.lock_dir,
+            "REGISTRY_FILE": os.path.join(self.root, "coordination.sqlite3"),
+            # Without ffmpeg, mixing is a copy: the /play cases measure the request path, not the encoder
+            "ffmpeg_path": lambda: None,
+        }
+
+
+def bench_parsing(ws: Workspace, repeat: int) -> dict:
+    return {
+        "parse_chapters_from_text": measure(
+            lambda: pdf_content_parser.parse_chapters_from_text(ws.text), repeat, number=5),
+    }
+
+
+def bench_resolution(ws: Workspace, repeat: int) -> dict:
+    pdf_content_parser.parse_pdf_content()  # parse once; the cases below hit the memoized corpus
+
+    def resolve_all():
+        for episode in ws.episodes:
+            pdf_content_parser.get_pdf_content_for_episode(episode)
+
+    def extract_all():
+        for chapter in ws.corpus:
+            file_utils.extract_chapter_text(chapter)
+
+    def drop_index_memo():
+        file_utils._pdf_index = None
+
+    file_utils.extract_chapter_text(next(iter(ws.corpus)))  # build the on-disk PDF index once
+    return {
+        "get_pdf_content_for_episode[all]": measure(resolve_all, repeat, number=20),
+        "extract_chapter_text[all,warm]": measure(extract_all, repeat, number=20),
+        "extract_chapter_text[index_from_disk]": measure(
+            lambda: file_utils.extract_chapter_text(next(iter(ws.corpus))), repeat, setup=drop_index_memo),
+    }
+
+
+def bench_audio_map(ws: Workspace, repeat: int) -> dict:
+    def build():
+        generate_audio_map.create_audio_map(ws.audio_dir, ws.map_path, ws.stories)
+
+    def remove_map():
+        if os.path.exists(ws.map_path):
+            os.remove(ws.map_path)
+
+    build()
+    return {
+        "create_audio_map[incremental]": measure(build, repeat, number=5),
+        "create_audio_map[cold]": measure(build, repeat, setup=remove_map),
+    }
+
+
+def bench_requests(ws: Workspace, repeat: int) -> dict:
+    client = TestClient(app)
+    audio_map, _ = generate_audio_map.create_audio_map(ws.audio_dir, ws.map_path, ws.stories)
+    app.state.audio_map = audio_map
+    story_generator._catalog["stamp"] = None
+
+    mapped = ws.episodes[0]
+    unmapped = list(ws.corpus)[1]  # a chapter title that is not a catalog episode
+    etag = client.get("/stories").headers["etag"]
+
+    def play(title):
+        response = client.post("/play/male", json={"chapter_title": title})
+        assert response.status_code == 200, response.text
+
+    def clear_generated():
+        for name in os.listdir(ws.generated_dir):
+            path = os.path.join(ws.generated_dir, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    play(unmapped)  # leave the synthesized file in place for the cache-hit case
+    return {
+        "play[audio_map_hit]": measure(lambda: play(mapped), repeat, number=50),
+        "play[synthesis_cache_hit]": measure(lambda: play(unmapped), repeat, number=50),
+        "play[generate_stub_tts]": measure(lambda: play(unmapped), repeat, setup=clear_generated),
+        "stories[gzip]": measure(
+            lambda: client.get("/stories", headers={"Accept-Encoding": "gzip"}), repeat, number=50),
+        "stories[304]": measure(
+            lambda: client.get("/stories", headers={"If-None-Match": etag}), repeat, number=50),
+    }
+
+
+SUITES = {
+    "parsing": bench_parsing,
+    "resolution": bench_resolution,
+    "audio_map": bench_audio_map,
+    "requests": bench_requests,
+}
+
+
+def calibrate(root: str, repeat: int) -> float:
+    """Median time of a fixed mix of JSON, regex, hashing and small-file work on this machine.
+
+    Cases are compared relative to it, so a baseline recorded on a faster or
+    slower machine still catches regressions of the code.
+    """
+    records = [{"title": f"Chapter {i}", "text": "the story of the avatara " * 20} for i in range(200)]
+    text = json.dumps(records)
+    blob = text.encode("utf-8") * 8
+    path = os.path.join(root, "calibration.bin")
+
+    def workload():
+        json.loads(json.dumps(records))
+        re.findall(r"[a-z]+", text)
+        hashlib.sha256(blob).hexdigest()
+        with open(path, "wb") as f:
+            f.write(blob)
+        with open(path, "rb") as f:
+            f.read()
+
+    return measure(workload, max(repeat, 5), number=10)["median_us"]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Cases slower than baseline * machine speed factor * tolerance, as (name, limit, now)"""
+    scale = 1.0
+    if results.get("calibration_us") and baseline.get("calibration_us"):
+        scale = results["calibration_us"] / baseline["calibration_us"]
+    regressions = []
+    for name, case in results["cases"].items():
+        reference = baseline.get("cases", {}).get(name)
+        if reference and case["median_us"] > reference["median_us"] * scale * tolerance:
+            regressions.append((name, reference["median_us"] * scale * tolerance, case["median_us"]))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="run only these suites (repeatable); default: all")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed rounds per case")
+    parser.add_argument("--chapters", type=int, default=40, help="chapters in the synthetic corpus")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown factor before a case counts as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    suites = args.suite or list(SUITES)
+    root = tempfile.mkdtemp(prefix="omstream-bench-")
+    results = {"python": sys.version.split()[0], "chapters": args.chapters, "cases": {}}
+    try:
+        ws = Workspace(root, args.chapters)
+        calibration_before = calibrate(root, args.repeat)
+        with contextlib.ExitStack() as stack:
+            redirect_paths(stack, ws.overrides())
+            stack.enter_context(mock.patch.object(tts_service, "_communicate", fixtures.StubCommunicate))
+            for suite in suites:
+                print(f"⏱️  Running {suite} benchmarks...")
+                # The code under test prints progress; keep it out of the report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    cases = SUITES[suite](ws, args.repeat)
+                for name, case in cases.items():
+                    print(f"   {case['median_us']:12.1f} µs  {name}")
+                results["cases"].update(cases)
+        # Measured on both sides of the cases, so a load change during the run affects both
+        results["calibration_us"] = round((calibration_before + calibrate(root, args.repeat)) / 2, 2)
+        print(f"📏 Calibration workload: {results['calibration_us']:.1f} µs")
+    finally:
+        shutdown_executors()
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️  No baseline to compare against (run with --save-baseline)")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("calibration_us"):
+        print(f"📏 This machine runs the calibration at "
+              f"{results['calibration_us'] / baseline['calibration_us']:.2f}x the baseline's time")
+    else:
+        print("⚠️  Baseline has no calibration; comparing absolute timings (re-save it with --save-baseline)")
+    regressions = compare(results, baseline, args.tolerance)
+    for name, limit, now in regressions:
+        print(f"❌ {name}: {now:.1f} µs, limit on this machine {limit:.1f} µs")
+    if regressions:
+        return 1
+    print(f"✅ No case slower than {args.tolerance}x the (calibrated) baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Measure the backend's cold import time and fail when it exceeds a budget"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+DEFAULT_MODULE = "app.main"
+DEFAULT_RUNS = 5
+DEFAULT_BUDGET_MS = 800
+DEFAULT_TOP = 15
+
+# Heavy dependencies the backend only loads on first use; importing any of them
+# at startup is a regression even when the total still fits the budget
+DEFERRED_MODULES = ("edge_tts", "pdfplumber", "PyPDF2", "numpy")
+
+
+def measure_once(module: str) -> dict:
+    """Import `module` in a fresh interpreter and return {module: cumulative_us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def run_benchmark(module: str, runs: int) -> dict:
+    samples = [measure_once(module) for _ in range(runs)]
+    totals = [sample[module] / 1000 for sample in samples]
+
+    modules = {}
+    for sample in samples:
+        for name, cumulative in sample.items():
+            modules.setdefault(name, []).append(cumulative / 1000)
+    per_module = {name: round(statistics.median(values), 2) for name, values in modules.items()}
+
+    return {
+        "module": module,
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "total_ms": {
+            "median": round(statistics.median(totals), 2),
+            "min": round(min(totals), 2),
+            "max": round(max(totals), 2),
+        },
+        "modules_ms": dict(sorted(per_module.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="module imported from backend/")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="fresh interpreters to sample")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="fail when the median import time exceeds this")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP, help="slowest modules to print")
+    parser.add_argument("--output", help="write the full results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"⏱️  Importing {args.module} in {args.runs} fresh interpreters...")
+    results = run_benchmark(args.module, args.runs)
+    results["budget_ms"] = args.budget_ms
+
+    total = results["total_ms"]
+    print(f"📊 {args.module}: median {total['median']} ms (min {total['min']}, max {total['max']})")
+    for name, cost in list(results["modules_ms"].items())[:args.top]:
+        print(f"   {cost:9.2f} ms  {name}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    eager = [name for name in DEFERRED_MODULES if name in results["modules_ms"]]
+    if eager:
+        print(f"❌ Deferred modules imported at startup: {', '.join(eager)}")
+        return 1
+    if total["median"] > args.budget_ms:
+        print(f"❌ Startup budget exceeded: {total['median']} ms > {args.budget_ms} ms")
+        return 1
+    print(f"✅ Within startup budget of {args.budget_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
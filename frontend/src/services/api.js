@@ -35,9 +35,10 @@ export async function playChapter(chapterTitle, voiceGender = "male") {
 }
 
 /**
- * Generate episode from free text
+ * Generate episode from free text.
+ * The backend queues the job; poll its status until the audio is ready.
  */
-export async function generateEpisode(text) {
+export async function generateEpisode(text, { pollIntervalMs = 2000 } = {}) {
   const res = await fetch(`${BASE_URL}/generate_episode`, {
     method: "POST",
     headers: {
@@ -50,5 +51,22 @@ export async function generateEpisode(text) {
     throw new Error("Failed to generate episode");
   }
 
-  return res.json(); // { url: "/audio/xyz.mp3" }
+  const { status_url: statusUrl } = await res.json(); // { job_id, status, status_url }
+
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+
+    const jobRes = await fetch(`${BASE_URL}${statusUrl}`);
+    if (!jobRes.ok) {
+      throw new Error("Failed to generate episode");
+    }
+
+    const job = await jobRes.json(); // { job_id, status, url, error }
+    if (job.status === "done") {
+      return { url: job.url }; // { url: "/audio/xyz.mp3" }
+    }
+    if (job.status === "failed") {
+      throw new Error(job.error || "Failed to generate episode");
+    }
+  }
 }
@@ -6,9 +6,12 @@ Phase 6: High-Fidelity Audio Production - All Episodes Unlocked
 
 import os
 import sys
-import json
 import asyncio
+import argparse
 import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Add PDF content parser
@@ -16,9 +19,15 @@ from pdf_content_parser import get_pdf_content_for_episode
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
 from backend.app.services.story_generator import load_stories
-from backend.app.services.tts_service import generate_speech
+from backend.app.services.tts_service import generate_speech, check_rate, voice_label, DEFAULT_RATE
 from backend.app.services.audio_service import mix_with_ambience
-from backend.app.config import BASE_DIR, GENERATED_DIR
+from backend.app.services.hls_service import package_hls
+from backend.app.services.metrics_service import time_stage, stage_seconds, render_metrics
+from backend.app.services.audio_map_service import variant_key
+from backend.app.utils.manifest_utils import AudioManifest
+from backend.app.utils.file_utils import content_hash
+from backend.app.utils.concurrency_utils import temp_path_for
+from backend.app.config import BASE_DIR, GENERATED_DIR, MIX_WORKERS, VARIANT_VOICES, VARIANT_RATES
 
 # Audio directory setup
 AUDIO_DIR = os.path.join(BASE_DIR, "static", "audio")
@@ -27,6 +36,12 @@ os.makedirs(AUDIO_DIR, exist_ok=True)
 # Audio map file
 AUDIO_MAP_FILE = os.path.join(BASE_DIR, "audio_map.json")
 
+# Batch runner defaults (overridable from the command line)
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 3
+DEFAULT_RATE_PER_MINUTE = 20
+RETRY_BASE_DELAY = 2.0  # seconds, doubled on every retry
+
 def clean_filename(title, category="", subcategory=""):
     """Create descriptive filename based on episode info"""
     # Clean title
@@ -62,6 +77,14 @@ def clean_filename(title, category="", subcategory=""):
     
     return f"{clean_title}.mp3"
 
+def variant_filename(filename, voice_gender="male", rate=DEFAULT_RATE):
+    """Filename of one voice/rate variant; the default narration keeps the plain name"""
+    if variant_key(voice_gender, rate) == variant_key("male"):
+        return filename
+    stem, ext = os.path.splitext(filename)
+    rate_slug = rate.replace("+", "plus").replace("-", "minus").rstrip("%")
+    return f"{stem}_{voice_label(voice_gender)}_{rate_slug}{ext}"
+
 def collect_pdf_deities_only():
     """Collect only deities that have content in PDF"""
     from pdf_content_parser import parse_pdf_content
@@ -103,20 +126,72 @@ def collect_all_episodes(stories_data):
     
     return episodes
 
-async def generate_episode_audio(title, category="", subcategory="", voice_gender="male"):
-    """Generate audio for a single episode using PDF content"""
-    filename = clean_filename(title, category, subcategory)
+class RateLimiter:
+    """Allow at most `per_minute` calls in any rolling 60 second window (0 = unlimited)"""
+    
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._calls = deque()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        if not self.per_minute:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= 60:
+                    self._calls.popleft()
+                if len(self._calls) < self.per_minute:
+                    self._calls.append(now)
+                    return
+                await asyncio.sleep(60 - (now - self._calls[0]))
+
+class BatchProgress:
+    """Counts finished episodes and prints a progress/ETA line after each one"""
+    
+    def __init__(self, total):
+        self.total = total
+        self.succeeded = 0
+        self.failed = 0
+        self.started = time.monotonic()
+    
+    def update(self, success):
+        if success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        
+        done = self.succeeded + self.failed
+        elapsed = time.monotonic() - self.started
+        remaining = elapsed / done * (self.total - done)
+        print(
+            f"📈 [{done}/{self.total}] ✅ {self.succeeded} ❌ {self.failed} | "
+            f"elapsed {format_duration(elapsed)} | ETA {format_duration(remaining)}",
+            flush=True
+        )
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+async def generate_episode_audio(title, category="", subcategory="", voice_gender="male", rate=DEFAULT_RATE,
+                                 rate_limiter=None, tts_slots=None, retries=0, mix_executor=None):
+    """Generate audio for a single episode in one voice/rate using PDF content"""
+    filename = variant_filename(clean_filename(title, category, subcategory), voice_gender, rate)
     output_path = os.path.join(AUDIO_DIR, filename)
     
     # Skip if already exists
     if os.path.exists(output_path):
-        print(f"✓ Skipping {title} (already exists)")
+        print(f"✓ Skipping {title} [{variant_key(voice_gender, rate)}] (already exists)")
         return filename
     
-    print(f"🎙️  Generating {title}... ({category} / {subcategory})")
+    print(f"🎙️  Generating {title} [{variant_key(voice_gender, rate)}]... ({category} / {subcategory})")
     
     # Get content from PDF only
-    text = get_pdf_content_for_episode(title)
+    with time_stage("pdf_extraction"):
+        text = get_pdf_content_for_episode(title)
     
     if not text:
         print(f"⚠️  No PDF content found for {title}, skipping...")
@@ -124,28 +199,125 @@ async def generate_episode_audio(title, category="", subcategory="", voice_gende
     else:
         print(f"✅ Using PDF content for {title} ({len(text)} chars)")
     
-    try:
-        # Generate speech with male voice only
-        speech_file = await generate_speech(text, "male")
-        
-        # Mix with ambience (simplified)
-        await asyncio.get_event_loop().run_in_executor(
-            None, mix_with_ambience, speech_file, output_path
-        )
-        
-        # Clean up temporary speech file
-        if os.path.exists(speech_file):
-            os.remove(speech_file)
+    for attempt in range(retries + 1):
+        speech_file = None
+        try:
+            # Long texts are several TTS requests; each one takes a slot and counts against the rate cap.
+            # generate_speech times the requests ("tts") apart from waits for a slot or the cap ("tts_wait")
+            speech_file = await generate_speech(
+                text, voice_gender, rate, semaphore=tts_slots, rate_limiter=rate_limiter
+            )
+            
+            # Mix with ambience (in the mixing process pool when one is given). Written under
+            # a temp name and renamed, so a failed or killed run never leaves a truncated
+            # MP3 that the next run would skip as done
+            tmp_path = temp_path_for(output_path)
+            try:
+                with time_stage("mixing"):
+                    await asyncio.get_event_loop().run_in_executor(
+                        mix_executor, mix_with_ambience, speech_file, tmp_path
+                    )
+                os.replace(tmp_path, output_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            
+            print(f"✅ Generated {filename}")
+            
+            # Segmented playlist for instant seek (the MP3 stays the primary output)
+            try:
+                with time_stage("hls_packaging"):
+                    await asyncio.get_event_loop().run_in_executor(mix_executor, package_hls, filename)
+            except Exception as e:
+                print(f"⚠️  HLS packaging failed for {filename}: {e}")
+            
+            return filename
+            
+        except Exception as e:
+            if attempt == retries:
+                print(f"❌ Failed to generate {title}: {e}")
+                return None
+            delay = RETRY_BASE_DELAY * 2 ** attempt
+            print(f"⚠️  {title} failed ({e}), retry {attempt + 1}/{retries} in {delay:.0f}s")
+            await asyncio.sleep(delay)
         
-        print(f"✅ Generated {filename}")
-        return filename
+        finally:
+            # Clean up temporary speech file
+            if speech_file and os.path.exists(speech_file):
+                os.remove(speech_file)
+
+async def run_batch(episodes, on_generated, voices=VARIANT_VOICES, rates=VARIANT_RATES,
+                    concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES,
+                    rate_per_minute=DEFAULT_RATE_PER_MINUTE, mix_workers=MIX_WORKERS):
+    """Generate every episode in every voice x rate variant, with at most `concurrency`
+    episodes and `concurrency` TTS requests in flight and a TTS rate cap"""
+    variants = [(voice_gender, rate) for voice_gender in voices for rate in rates]
+    semaphore = asyncio.Semaphore(concurrency)
+    tts_slots = asyncio.Semaphore(concurrency)
+    rate_limiter = RateLimiter(rate_per_minute)
+    progress = BatchProgress(len(episodes) * len(variants))
+    
+    with ProcessPoolExecutor(max_workers=mix_workers) as mix_executor:
+        async def run_one(episode, voice_gender, rate):
+            async with semaphore:
+                filename = await generate_episode_audio(
+                    episode["title"], episode["category"], episode["subcategory"], voice_gender, rate,
+                    rate_limiter=rate_limiter, tts_slots=tts_slots, retries=retries, mix_executor=mix_executor
+                )
+            if filename:
+                on_generated(episode, voice_gender, rate, filename)
+            progress.update(filename is not None)
         
-    except Exception as e:
-        print(f"❌ Failed to generate {title}: {e}")
-        return None
+        await asyncio.gather(*(
+            run_one(episode, voice_gender, rate) for episode in episodes for voice_gender, rate in variants
+        ))
+    return progress
+
+def print_stage_summary():
+    """Where the batch spent its time, from the same stage timers the server exports"""
+    print("\n⏱️  Time per stage:")
+    for stage, summary in stage_seconds.summary().items():
+        if summary["count"]:
+            print(f"  {stage:15s} {summary['count']:4d}x  total {format_duration(summary['total_seconds'])}  "
+                  f"avg {summary['avg_seconds']:.2f}s")
+
+def parse_voices(value):
+    voices = tuple(v.strip().lower() for v in value.split(",") if v.strip())
+    unknown = [v for v in voices if v not in ("male", "female")]
+    if not voices or unknown:
+        raise argparse.ArgumentTypeError(f"voices must be 'male' and/or 'female', got {value!r}")
+    return voices
+
+def parse_rates(value):
+    try:
+        rates = tuple(check_rate(r.strip()) for r in value.split(",") if r.strip())
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    if not rates:
+        raise argparse.ArgumentTypeError("at least one rate is required")
+    return rates
 
-async def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate audio for every PDF-backed episode")
+    parser.add_argument("--voices", type=parse_voices, default=VARIANT_VOICES,
+                        help="comma-separated voices to generate (default: VARIANT_VOICES in config.py)")
+    parser.add_argument("--rates", type=parse_rates, default=VARIANT_RATES,
+                        help="comma-separated speaking rates, e.g. --rates=-10%%,+25%% (default: VARIANT_RATES in config.py)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="episodes (and TTS requests) in flight at the same time")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help="retries per episode, with exponential backoff")
+    parser.add_argument("--rate-per-minute", type=int, default=DEFAULT_RATE_PER_MINUTE,
+                        help="max TTS requests started per minute (0 = unlimited)")
+    parser.add_argument("--mix-workers", type=int, default=MIX_WORKERS,
+                        help="processes mixing finished speech with the ambience bed")
+    parser.add_argument("--metrics-file",
+                        help="write stage timings in Prometheus text format to this file when done")
+    return parser.parse_args(argv)
+
+async def main(args=None):
     """Main batch generation function - PDF deities only"""
+    args = args or parse_args([])
     print("🎬 Smart Story Teller - Batch Audio Generator")
     print("🔓 PDF Deities Only - Generating Audio for PDF Content")
     print("=" * 60)
@@ -174,11 +346,8 @@ async def main():
     skipped_episodes = []
     
     for episode in all_episodes:
-        title_lower = episode["title"].lower()
-        # Clean title for comparison (remove numbering and special chars)
-        clean_title = re.sub(r'[^\w\s-]', '', episode["title"]).lower().strip()
-        
-        if any(deity in clean_title for deity in pdf_deities):
+        # Resolved through the memoized title index (no re-parse per episode)
+        if get_pdf_content_for_episode(episode["title"]) is not None:
             pdf_episodes.append(episode)
         else:
             skipped_episodes.append(episode)
@@ -193,52 +362,56 @@ async def main():
     if len(skipped_episodes) > 5:
         print(f"  ... and {len(skipped_episodes) - 5} more")
     
-    # Load existing audio map
-    audio_map = {}
-    if os.path.exists(AUDIO_MAP_FILE):
-        with open(AUDIO_MAP_FILE, 'r') as f:
-            audio_map = json.load(f)
+    # Load existing audio map (snapshot + any journal left by an interrupted run)
+    manifest = AudioManifest(AUDIO_MAP_FILE)
+    audio_map = manifest.load()
     
-    print(f"\n🎵 Starting audio generation at 1.25x speed...")
+    print(f"\n🎵 Starting audio generation: voices {', '.join(args.voices)} x rates {', '.join(args.rates)}")
     print(f"📍 Output directory: {AUDIO_DIR}")
     print(f"🗺️  Audio map file: {AUDIO_MAP_FILE}")
     
-    # Update TTS service to use 1.25x speed
-    import backend.app.services.tts_service as tts_service
-    original_generate = tts_service.generate_speech
-    
-    async def generate_speech_fast(text, voice_gender):
-        """Generate speech at 1.25x speed"""
-        return await original_generate(text, voice_gender, rate="+25%")  # 1.25x speed
+    # Generate audio for the PDF episodes concurrently, every variant in the same run
+    print(f"⚙️  Concurrency {args.concurrency}, {args.retries} retries, "
+          f"{args.rate_per_minute or 'unlimited'} TTS requests/minute, {args.mix_workers} mix workers")
     
-    tts_service.generate_speech = generate_speech_fast
+    def record_episode(episode, voice_gender, rate, filename):
+        with time_stage("file_io"):
+            digest = content_hash(os.path.join(AUDIO_DIR, filename))
+        # Journal the variant (the chapter's other variants are kept); the JSON
+        # snapshot is rewritten atomically every few entries
+        manifest.append(episode["title"], {
+            "filename": filename,
+            "sha256": digest,
+            "category": episode["category"],
+            "subcategory": episode["subcategory"],
+            "voice": voice_label(voice_gender),
+            "rate": rate
+        }, variant=variant_key(voice_gender, rate))
     
-    # Generate audio for each PDF episode (male voice only for better quality)
-    for episode in pdf_episodes:
-        title = episode["title"]
-        category = episode["category"]
-        subcategory = episode["subcategory"]
-        
-        filename = await generate_episode_audio(title, category, subcategory, "male")
-        
-        if filename:
-            # Update audio map
-            audio_map[title] = {
-                "filename": filename,
-                "category": category,
-                "subcategory": subcategory,
-                "voice": "male",
-                "speed": "1.25x"
-            }
-            
-            # Save audio map after each successful generation
-            with open(AUDIO_MAP_FILE, 'w') as f:
-                json.dump(audio_map, f, indent=2)
+    try:
+        progress = await run_batch(
+            pdf_episodes, record_episode,
+            voices=args.voices,
+            rates=args.rates,
+            concurrency=args.concurrency,
+            retries=args.retries,
+            rate_per_minute=args.rate_per_minute,
+            mix_workers=args.mix_workers
+        )
+    finally:
+        manifest.compact()
+    audio_map = manifest.entries
     
     print(f"\n🎉 Batch generation complete!")
-    print(f"📊 Generated {len(audio_map)} audio files from PDF content")
+    print(f"📊 {progress.succeeded} audio files ready for {len(audio_map)} chapters ({progress.failed} failed)")
     print(f"📄 Audio map saved to: {AUDIO_MAP_FILE}")
-    print(f"🎵 PDF episodes are now ready for playback at 1.25x speed!")
+    print(f"🎵 PDF episodes are now ready for playback in every generated voice and rate!")
+    
+    print_stage_summary()
+    if args.metrics_file:
+        with open(args.metrics_file, "w", encoding="utf-8") as f:
+            f.write(render_metrics())
+        print(f"📈 Stage metrics written to: {args.metrics_file}")
     
     if skipped_episodes:
         print(f"\n📝 Skipped episodes (no PDF content):")
@@ -247,4 +420,4 @@ async def main():
         print(f"\n💡 Add these deities to PDF to generate their audio later")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
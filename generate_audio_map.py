@@ -1,64 +1,169 @@
-import json
+import argparse
+import hashlib
 import os
 import re
 
-def sanitize_title(title):
-    # Handle special case for Umā
-    if "Umā (also known as Pārvati, Durgā, Kāli, etc.)" in title:
-        return "um_also_known_as_prvati_durg_kli_etc"
-
-    # Remove numbers and punctuation, handle special characters
-    sanitized = re.sub(r'^\d+[a-z]?\.\s*', '', title)  # Remove leading numbers like '1. ' or '8a. '
-    # Allow unicode letters, remove other symbols
-    sanitized = re.sub(r'[^\w\s]', '', sanitized, flags=re.UNICODE)
-    sanitized = re.sub(r'\s+', '_', sanitized)
-    return sanitized.lower()
-
-def find_matching_audio_file(sanitized_title, audio_files):
-    # Special case for the complex 'Umā' title
-    if "um_also_known_as_prvati_durg_kli_etc" in sanitized_title:
-        for f in audio_files:
-            if "Umā_also_known_as_Pārvati_Durgā_Kāli_etc" in f:
-                return f
+from backend.app.utils.manifest_utils import AudioManifest
+from backend.app.utils.text_utils import NUMBERING_RE, PARENTHETICAL_RE, fold_title
+from backend.app.services.story_generator import load_stories
+from backend.app.services.audio_map_service import variant_key
 
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_DIR = os.path.join(ROOT_DIR, 'backend', 'static', 'audio')
+AUDIO_MAP_FILE = os.path.join(ROOT_DIR, 'backend', 'audio_map.json')
+
+# Category prefixes the batch generator puts in front of the episode name
+FILENAME_PREFIX_RE = re.compile(r'^(general|inferior)_(vishnu_|shiva_)?(rishis_|planets_)?', re.IGNORECASE)
+FILENAME_NUMBERING_RE = re.compile(r'^\d+[a-z]?_+', re.IGNORECASE)
+
+def skeleton(name):
+    # Older files replaced every non-ASCII character with '_', so 'PARASURĀMA' became
+    # 'PARASUR_MA'; dropping non-ASCII characters from both sides makes those comparable
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+def match_keys(name):
+    """Lookup keys for a title or bare filename, most specific first"""
+    return list(dict.fromkeys(key for key in (
+        fold_title(name).replace(' ', ''),
+        skeleton(NUMBERING_RE.sub('', name)),
+    ) if key))
+
+def title_keys(title):
+    keys = match_keys(title)
+    bare = PARENTHETICAL_RE.sub(' ', title)
+    if bare != title:
+        # 'Umā (also known as Pārvati, ...)' is stored under its short name
+        keys += [key for key in match_keys(bare) if key not in keys]
+    return keys
+
+def filename_stem(filename):
+    stem = os.path.splitext(filename)[0]
+    stem = FILENAME_PREFIX_RE.sub('', stem)
+    return FILENAME_NUMBERING_RE.sub('', stem)
+
+def build_filename_index(audio_files):
+    """Normalize every filename once: key -> sorted list of filenames carrying it"""
+    index = {}
     for audio_file in audio_files:
-        # Create a sanitized version of the audio filename for comparison
-        sanitized_audio_name = re.sub(r'^(general|inferior)_(vishnu_|shiva_)?(rishis_|planets_)?', '', audio_file.lower())
-        sanitized_audio_name = sanitized_audio_name.replace('.mp3', '')
-        if sanitized_title in sanitized_audio_name:
-            return audio_file
-    return None
-
-def create_audio_map():
-    backend_dir = os.path.dirname(os.path.abspath(__file__))
-    stories_path = os.path.join(backend_dir, 'backend', 'app', 'data', 'stories.json')
-    audio_dir = os.path.join(backend_dir, 'backend', 'static', 'audio')
-
-    with open(stories_path, 'r', encoding='utf-8') as f:
-        stories_data = json.load(f)
-
-    audio_files = [f for f in os.listdir(audio_dir) if f.endswith('.mp3')]
-    
-    audio_map = {}
+        for key in match_keys(filename_stem(audio_file).replace('_', ' ')):
+            index.setdefault(key, set()).add(audio_file)
+    return {key: sorted(files) for key, files in index.items()}
+
+def resolve_audio_file(title, filename_index):
+    """Return (filename, candidates); filename is None when unmatched or ambiguous"""
+    for key in title_keys(title):
+        candidates = filename_index.get(key)
+        if candidates:
+            return (candidates[0] if len(candidates) == 1 else None), candidates
+    return None, []
+
+def file_sha256(path):
+    # Recorded in the map so the server can hand out fingerprinted, immutable URLs
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
+def iter_episode_titles(stories_data):
     for category in stories_data:
         for subcategory in category.get('subcategories', []):
-            for episode in subcategory.get('episodes', []):
-                sanitized_episode = sanitize_title(episode)
-                match = find_matching_audio_file(sanitized_episode, audio_files)
-                if match:
-                    audio_map[episode] = {'filename': match}
-            for sub_series_episode in subcategory.get('sub_series', []):
-                sanitized_sub_episode = sanitize_title(sub_series_episode)
-                match = find_matching_audio_file(sanitized_sub_episode, audio_files)
-                if match:
-                    audio_map[sub_series_episode] = {'filename': match}
-
-    output_path = os.path.join(backend_dir, 'backend', 'audio_map.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(audio_map, f, indent=4, ensure_ascii=False)
-
-    print(f'Audio map generated at {output_path}')
+            yield from subcategory.get('episodes', [])
+            yield from subcategory.get('sub_series', [])
+
+def create_audio_map(audio_dir=AUDIO_DIR, map_path=AUDIO_MAP_FILE, stories_data=None):
+    """Rebuild the audio map, hashing only files whose size/mtime changed since the last one"""
+    if stories_data is None:
+        stories_data = load_stories()
+
+    manifest = AudioManifest(map_path)
+    previous = manifest.load()
+    # filename -> previous entry, so unchanged files keep their hash and metadata
+    known_files = {entry['filename']: entry for entry in previous.values() if 'filename' in entry}
+
+    audio_stats = {}
+    with os.scandir(audio_dir) as entries:
+        for dir_entry in entries:
+            if dir_entry.is_file() and dir_entry.name.endswith('.mp3'):
+                stat = dir_entry.stat()
+                audio_stats[dir_entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+    # Voice/rate variants are recorded by the batch generator and carried over from the previous map;
+    # only the default narration is matched by filename
+    variant_files = {variant.get('filename') for entry in previous.values()
+                     for variant in entry.get('variants', {}).values()}
+    filename_index = build_filename_index(f for f in audio_stats if f not in variant_files)
+
+    audio_map = {}
+    report = {'unmatched': [], 'ambiguous': {}, 'kept': [], 'hashed': 0, 'reused': 0}
+
+    def refresh(entry, filename):
+        size, mtime_ns = audio_stats[filename]
+        if entry.get('size') == size and entry.get('mtime_ns') == mtime_ns and entry.get('sha256'):
+            report['reused'] += 1
+        else:
+            entry['sha256'] = file_sha256(os.path.join(audio_dir, filename))
+            report['hashed'] += 1
+        entry.update({'filename': filename, 'size': size, 'mtime_ns': mtime_ns})
+        return entry
+
+    for title in iter_episode_titles(stories_data):
+        variants = {
+            key: refresh(dict(variant), variant['filename'])
+            for key, variant in previous.get(title, {}).get('variants', {}).items()
+            if variant.get('filename') in audio_stats
+        }
+        match, candidates = None, []
+        # The default narration may already be one of the recorded variants
+        if variant_key('male') not in variants:
+            match, candidates = resolve_audio_file(title, filename_index)
+        if match is None and variant_key('male') not in variants:
+            pinned = previous.get(title, {}).get('filename')
+            if pinned in audio_stats:
+                # Hand-curated entries the matcher cannot derive survive a rebuild
+                match = pinned
+                report['kept'].append(title)
+            elif candidates:
+                report['ambiguous'][title] = candidates
+            else:
+                report['unmatched'].append(title)
+
+        entry = refresh(dict(known_files.get(match, {})), match) if match else {}
+        entry.pop('variants', None)
+        if variants:
+            entry['variants'] = variants
+        if entry:
+            audio_map[title] = entry
+
+    # Written as a fresh snapshot; the journal it supersedes is folded in and removed
+    manifest.replace(audio_map)
+
+    matched_files = {entry['filename'] for entry in audio_map.values() if 'filename' in entry}
+    matched_files.update(v['filename'] for entry in audio_map.values() for v in entry.get('variants', {}).values())
+    matched_files.update(f for candidates in report['ambiguous'].values() for f in candidates)
+    report['orphaned'] = sorted(set(audio_stats) - matched_files)
+    report['mapped'] = len(audio_map)
+    return audio_map, report
+
+def print_report(report, map_path):
+    print(f'Audio map generated at {map_path}')
+    print(f"{report['mapped']} titles mapped ({report['hashed']} files hashed, {report['reused']} unchanged)")
+    for title in report['kept']:
+        print(f'Kept existing mapping for: {title}')
+    for title, candidates in report['ambiguous'].items():
+        print(f"Ambiguous: {title} -> {', '.join(candidates)}")
+    for title in report['unmatched']:
+        print(f'Unmatched: {title}')
+    for filename in report['orphaned']:
+        print(f'No episode for file: {filename}')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Build backend/audio_map.json from the files in static/audio')
+    parser.add_argument('--audio-dir', default=AUDIO_DIR)
+    parser.add_argument('--output', default=AUDIO_MAP_FILE)
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
-    create_audio_map()
+    args = parse_args()
+    _, report = create_audio_map(args.audio_dir, args.output)
+    print_report(report, args.output)
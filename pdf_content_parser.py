@@ -7,223 +7,232 @@ Extracts content from mythology_source.pdf using CHAPTER_TITLE format
 import os
 import re
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pdfplumber
 import PyPDF2
 
-def extract_pdf_content(pdf_path):
+from backend.app.utils.text_utils import build_title_index, resolve_title
+
+# Pages handed to each extraction worker; small enough to keep results flowing in order
+PAGES_PER_TASK = 8
+
+CHAPTER_MARKER = "CHAPTER_TITLE:"
+
+def _page_count(pdf_path):
+    """Number of pages in the PDF"""
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            return len(pdf.pages)
+    except Exception as e:
+        print(f"⚠️  pdfplumber failed to open PDF: {e}")
+        with open(pdf_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+
+def _extract_page_range(pdf_path, start, stop):
+    """Extract pages [start, stop) with pdfplumber, falling back to PyPDF2 per page"""
+    texts = []
+    plumber_pdf = None
+    fallback_reader = None
+    
+    try:
+        plumber_pdf = pdfplumber.open(pdf_path)
+    except Exception as e:
+        print(f"⚠️  pdfplumber failed: {e}")
+    
+    try:
+        for page_number in range(start, stop):
+            text = None
+            if plumber_pdf is not None:
+                try:
+                    text = plumber_pdf.pages[page_number].extract_text()
+                except Exception as e:
+                    print(f"⚠️  pdfplumber failed on page {page_number + 1}: {e}")
+            
+            if text is None:
+                try:
+                    # Fallback to PyPDF2 for this page only
+                    if fallback_reader is None:
+                        fallback_reader = PyPDF2.PdfReader(pdf_path)
+                    text = fallback_reader.pages[page_number].extract_text()
+                except Exception as e2:
+                    print(f"❌ Both PDF readers failed on page {page_number + 1}: {e2}")
+            
+            texts.append(text or "")
+    finally:
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+    
+    return texts
+
+def iter_pdf_pages(pdf_path, workers=None):
+    """Yield page texts in page order, extracting page ranges across processes"""
+    page_count = _page_count(pdf_path)
+    ranges = [
+        (start, min(start + PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PAGES_PER_TASK)
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+    
+    if workers <= 1:
+        for start, stop in ranges:
+            yield from _extract_page_range(pdf_path, start, stop)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_page_range, pdf_path, start, stop) for start, stop in ranges]
+        # Results are consumed in submission order, so pages stay in order while
+        # later ranges are still being extracted
+        for future in futures:
+            yield from future.result()
+
+def extract_pdf_content(pdf_path, workers=None):
     """Extract all text from PDF using pdfplumber"""
     print(f"📖 Extracting content from: {pdf_path}")
     
     try:
-        # Try pdfplumber first (better for text extraction)
-        with pdfplumber.open(pdf_path) as pdf:
-            full_text = ""
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    full_text += text + "\n"
-            return full_text
+        return "".join(text + "\n" for text in iter_pdf_pages(pdf_path, workers) if text)
     except Exception as e:
-        print(f"⚠️  pdfplumber failed: {e}")
-        
-        try:
-            # Fallback to PyPDF2
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                full_text = ""
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        full_text += text + "\n"
-                return full_text
-        except Exception as e2:
-            print(f"❌ Both PDF readers failed: {e2}")
-            return ""
+        print(f"❌ PDF extraction failed: {e}")
+        return ""
 
-def parse_chapters_from_text(full_text):
-    """Parse chapters from PDF text using CHAPTER_TITLE format"""
-    if not full_text:
-        return {}
+def _parse_chapter_block(chapter_block):
+    """Parse one 'CHAPTER_TITLE: ...' block into (title, chapter dict or None)"""
+    title_match = re.match(r'CHAPTER_TITLE:\s*([^\n]+)', chapter_block)
+    if not title_match:
+        return None, None
     
-    print("🔍 Parsing chapters from PDF text...")
+    # Clean chapter title - take only the first line (deity name)
+    clean_title = title_match.group(1).strip()
     
-    # Find all chapter blocks with cleaner pattern
-    chapter_pattern = r'CHAPTER_TITLE:\s*([^\n]+)'
-    chapter_matches = re.findall(chapter_pattern, full_text)
+    # Extract story content between STORY START and STORY END
+    story_match = re.search(r'--- STORY START ---\s*(.*?)\s*--- STORY END\s*---', chapter_block, re.DOTALL)
     
-    parsed_content = {}
+    if not story_match:
+        print(f"⚠️  No story found for: {clean_title}")
+        return clean_title, None
     
-    for chapter_title in chapter_matches:
-        # Clean chapter title - take only the first line (deity name)
-        clean_title = chapter_title.strip()
-        
-        # Find the story content for this chapter
-        story_start = full_text.find(f"CHAPTER_TITLE: {chapter_title}")
-        if story_start == -1:
+    story_content = story_match.group(1).strip()
+    
+    # Clean up the story content
+    story_content = re.sub(r'\n+', ' ', story_content)  # Replace multiple newlines with spaces
+    story_content = re.sub(r'\s+', ' ', story_content)  # Replace multiple spaces with single space
+    
+    if len(story_content) <= 100:  # Only keep substantial content
+        print(f"⚠️  Chapter too short: {clean_title}")
+        return clean_title, None
+    
+    print(f"✅ Found chapter: {clean_title} ({len(story_content)} chars)")
+    return clean_title, {
+        "CHAPTER_TITLE": clean_title,
+        "STORY": story_content,
+        "WORD_COUNT": len(story_content.split()),
+        "CHARACTER_COUNT": len(story_content)
+    }
+
+def iter_chapters_from_pages(pages):
+    """Yield (title, chapter) pairs as soon as each chapter block is complete"""
+    buffer = ""
+    for text in pages:
+        if not text:
             continue
-            
-        # Find the next chapter or end of text
-        next_chapter = full_text.find("CHAPTER_TITLE:", story_start + 1)
-        
-        # Extract the chapter block
-        if next_chapter == -1:
-            chapter_block = full_text[story_start:]
-        else:
-            chapter_block = full_text[story_start:next_chapter]
+        buffer += text + "\n"
         
-        # Extract story content between STORY START and STORY END
-        story_match = re.search(r'--- STORY START ---\s*(.*?)\s*--- STORY END\s*---', chapter_block, re.DOTALL)
+        first = buffer.find(CHAPTER_MARKER)
+        if first == -1:
+            buffer = ""
+            continue
         
-        if story_match:
-            story_content = story_match.group(1).strip()
-            
-            # Clean up the story content
-            story_content = re.sub(r'\n+', ' ', story_content)  # Replace multiple newlines with spaces
-            story_content = re.sub(r'\s+', ' ', story_content)  # Replace multiple spaces with single space
-            
-            if len(story_content) > 100:  # Only keep substantial content
-                parsed_content[clean_title] = {
-                    "CHAPTER_TITLE": clean_title,
-                    "STORY": story_content,
-                    "WORD_COUNT": len(story_content.split()),
-                    "CHARACTER_COUNT": len(story_content)
-                }
-                print(f"✅ Found chapter: {clean_title} ({len(story_content)} chars)")
-            else:
-                print(f"⚠️  Chapter too short: {clean_title}")
-        else:
-            print(f"⚠️  No story found for: {clean_title}")
+        # Every block followed by another marker is complete
+        next_marker = buffer.find(CHAPTER_MARKER, first + 1)
+        while next_marker != -1:
+            title, chapter = _parse_chapter_block(buffer[first:next_marker])
+            if chapter:
+                yield title, chapter
+            first = next_marker
+            next_marker = buffer.find(CHAPTER_MARKER, first + 1)
+        buffer = buffer[first:]
     
+    if buffer.startswith(CHAPTER_MARKER):
+        title, chapter = _parse_chapter_block(buffer)
+        if chapter:
+            yield title, chapter
+
+def parse_chapters_from_pages(pages):
+    """Parse chapters from an iterable of page texts, e.g. iter_pdf_pages()"""
+    parsed_content = {}
+    for title, chapter in iter_chapters_from_pages(pages):
+        parsed_content.setdefault(title, chapter)
     return parsed_content
 
-def parse_pdf_content():
-    """Parse mythology_source.pdf and extract structured content"""
-    
-    pdf_path = os.path.join(os.path.dirname(__file__), 'backend', 'assets', 'mythology_source.pdf')
-    
-    if not os.path.exists(pdf_path):
-        print(f"❌ PDF not found: {pdf_path}")
+def parse_chapters_from_text(full_text):
+    """Parse chapters from PDF text using CHAPTER_TITLE format"""
+    if not full_text:
         return {}
     
-    # Extract text from PDF
-    full_text = extract_pdf_content(pdf_path)
+    print("🔍 Parsing chapters from PDF text...")
+    
+    return parse_chapters_from_pages([full_text])
+
+PDF_PATH = os.path.join(os.path.dirname(__file__), 'backend', 'assets', 'mythology_source.pdf')
+
+# Parsed corpus and its title-resolution index, reused until the PDF changes
+_corpus_cache = {"stamp": None, "content": {}, "title_index": {}}
+
+def _pdf_stamp(pdf_path):
+    stat = os.stat(pdf_path)
+    return (pdf_path, stat.st_size, stat.st_mtime_ns)
+
+def _parse_pdf_file(pdf_path):
+    """Extract and parse the PDF at pdf_path (uncached)"""
+    print(f"📖 Extracting content from: {pdf_path}")
     
-    if not full_text:
-        print("❌ No text extracted from PDF")
+    # Chapters are parsed while later pages are still being extracted
+    try:
+        structured_content = parse_chapters_from_pages(iter_pdf_pages(pdf_path))
+    except Exception as e:
+        print(f"❌ PDF extraction failed: {e}")
         return {}
     
-    # Parse chapters from the extracted text
-    structured_content = parse_chapters_from_text(full_text)
+    if not structured_content:
+        print("❌ No chapters extracted from PDF")
+        return {}
     
     print(f"📚 Successfully parsed {len(structured_content)} chapters from PDF")
     
     return structured_content
 
+def _load_corpus():
+    """Parse the PDF once per process and compile the title index alongside it"""
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        return {}, {}
+    
+    stamp = _pdf_stamp(PDF_PATH)
+    if _corpus_cache["stamp"] != stamp:
+        content = _parse_pdf_file(PDF_PATH)
+        _corpus_cache.update(
+            stamp=stamp,
+            content=content,
+            title_index=build_title_index(content.keys()),
+        )
+    return _corpus_cache["content"], _corpus_cache["title_index"]
+
+def parse_pdf_content():
+    """Parse mythology_source.pdf and extract structured content (memoized)"""
+    content, _ = _load_corpus()
+    return content
+
 def get_pdf_content_for_episode(episode_title):
     """Get PDF content for a specific episode"""
-    content = parse_pdf_content()
-    
-    # Try exact match first
-    if episode_title in content:
-        return content[episode_title]["STORY"]
-    
-    # Try case-insensitive match
-    for key, value in content.items():
-        if key.lower() == episode_title.lower():
-            return value["STORY"]
-    
-    # Try partial match (remove numbering and special chars)
-    clean_episode = re.sub(r'[^\w\s-]', '', episode_title).lower().strip()
-    for key, value in content.items():
-        clean_key = re.sub(r'[^\w\s-]', '', key).lower().strip()
-        if clean_episode in clean_key or clean_key in clean_episode:
-            return value["STORY"]
-    
-    # Special matching for numbered avatars and goddesses
-    episode_lower = episode_title.lower()
-    
-    # Avatar matching: "1. THE MATSYA OR FISH AVATĀRA" -> "MATSYA AVATĀRA"
-    if "avatāra" in episode_lower or "avatar" in episode_lower:
-        # Extract the full name after "THE" with a simple approach
-        # First, find the position after "THE"
-        the_pos = episode_title.find("THE ")
-        if the_pos == -1:
-            return None
-        
-        # Extract everything after "THE" until "AVAT"
-        avatar_part = episode_title[the_pos + 4:]
-        
-        # Now handle the OR part
-        or_pos = avatar_part.find(" OR ")
-        if or_pos == -1:
-            name_after_or = ""
-        else:
-            name_after_or = avatar_part[or_pos + 4:].strip()
-        
-        # Combine names to get the full avatar name
-        avatar_name = f"{avatar_part.strip()} {name_after_or}".strip()
-        for key in content.keys():
-            # Match both possible name combinations with PDF keys
-            if avatar_name.upper() in key.upper() and ("AVATĀRA" in key or "AVATAR" in key):
-                return content[key]["STORY"]
-        # Also try direct matching for numbered avatars without "THE"
-        avatar_match2 = re.search(r'^[1-9a]*\.?\s*(\w+)\s+AVAT', episode_title, re.IGNORECASE)
-        if avatar_match2:
-            # Extract the name after "THE" (everything after "THE" until "AVAT")
-            avatar_name = avatar_match2.group(1).strip()
-            avatar_name = avatar_match2.group(1).upper()
-            for key in content.keys():
-                # Match "KŪRMA" with "KŪRMA AVATĀRA"
-                if avatar_name in key.upper() and ("AVATĀRA" in key or "AVATAR" in key):
-                    return content[key]["STORY"]
-    
-    # Planet matching: "1. Ravi (Surya)" -> "RAVI (SŪRYA)"
-    if re.match(r'^\d+\.\s+', episode_title):
-        # Remove numbering and clean up
-        clean_name = re.sub(r'^\d+\.\s+', '', episode_title).strip()
-        
-        # Try exact match first
-        if clean_name in content:
-            return content[clean_name]["STORY"]
-        
-        # Try case-insensitive match
-        for key in content.keys():
-            if key.lower() == clean_name.lower():
-                return content[key]["STORY"]
-        
-        # Try partial match for planets
-        planet_match = re.match(r'^(\w+)\s+\([^)]+\)', clean_name)
-        if planet_match:
-            planet_name = planet_match.group(1)
-            for key in content.keys():
-                if planet_name.upper() in key.upper() and ('(' in key or 'SURYA' in key.upper() or 'SOMA' in key.upper()):
-                    return content[key]["STORY"]
-        
-        # Try goddess matching for numbered goddess forms
-        goddess_name = clean_name
-        for key in content.keys():
-            if goddess_name.upper() in key.upper() and key != goddess_name.upper():
-                return content[key]["STORY"]
-    
-    # Special cases for main deities
-    deity_mapping = {
-        "brahmā": "brahman",
-        "vishnu": "vishnu",  # Now Vishnu content is available!
-        "sarasvati": "sarasvati",
-        "lakshmi": "lakshmi",
-        "umā": "umā",
-        "pārvati": "umā",
-        "durgā": "umā",  # Main Durgā maps to Umā content
-        "ganesa": "ganesa",
-        "kartikeya": "kartikeya"
-    }
-    
-    for episode_key, pdf_key in deity_mapping.items():
-        if episode_lower == episode_key and pdf_key and pdf_key in content:
-            return content[pdf_key]["STORY"]
+    content, title_index = _load_corpus()
     
-    return None
+    # Folded, numbering-stripped and alias-aware lookup, e.g.
+    # "1. THE MATSYA OR FISH AVATĀRA" -> "MATSYA AVATĀRA", "1. Sugriva" -> "SUGRĪVA"
+    chapter_title = resolve_title(title_index, episode_title)
+    if chapter_title is None:
+        return None
+    return content[chapter_title]["STORY"]
 
 def save_structured_content():
     """Save structured content to JSON file"""